@@ -0,0 +1,118 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import load_premium_matrix, premium_stats
+from records import FundBatch, Status, format_limit
+
+# Columns available to rule expressions, one value per fund
+METRICS = {
+    "premium": "live premium rate in % (NaN when not reported)",
+    "limit": "daily limit in yuan (inf unlimited, -1 paused)",
+    "open": "purchasable now (not paused, limit not 0)",
+    "premium_mean": "mean premium over the last window runs",
+    "premium_std": "standard deviation of the premium over the last window runs",
+    "premium_z": "(premium - premium_mean) / premium_std",
+    "premium_change": "premium minus the last recorded premium",
+}
+
+
+class AlertEngine:
+    """Evaluates premium-rate alert rules against live values and history.
+
+    Rules come from "alerts" in config.json, each {"name", "when"} where
+    "when" is a pandas expression over METRICS, e.g. "premium > 3 and open"
+    or "premium_z > 2". History statistics are loaded once from the store;
+    evaluate() then builds one metrics frame for all funds and applies each
+    rule as a single vectorized expression over it.
+    """
+
+    def __init__(self, store, rules, window=20, min_periods=5, exclude_latest=False):
+        self.window = window
+        self.rules = self._validate(rules)
+        # Runs are on weekdays, so twice the window in calendar days covers it
+        since = (datetime.date.today() - datetime.timedelta(days=window * 2 + 14)).isoformat()
+        matrix = load_premium_matrix(store, since)
+        if exclude_latest:
+            # The run being evaluated is already stored; compare against the ones before it
+            matrix = matrix.iloc[:-1]
+        self.stats = premium_stats(matrix, window, min_periods)
+
+    def _validate(self, rules):
+        """Drop rules whose expression does not parse against the metric columns."""
+        empty = pd.DataFrame({name: pd.Series(dtype=bool if name == "open" else float) for name in METRICS})
+        valid = []
+        for rule in rules:
+            if not rule.get('when'):
+                continue
+            try:
+                empty.eval(rule['when'])
+            except Exception as e:
+                print(f"Ignoring invalid alert rule {rule.get('name')!r} ({rule['when']}): {e}")
+                continue
+            valid.append(rule)
+        return valid
+
+    def metrics(self, funds_data):
+        batch = funds_data if isinstance(funds_data, FundBatch) else FundBatch(funds_data)
+        codes = batch.codes
+        # Zero-copy views of the batch columns
+        premium = np.frombuffer(batch.premium, dtype=float)
+        limit = np.frombuffer(batch.limit, dtype=float)
+        state = np.frombuffer(batch.state, dtype=np.int8)
+
+        stats = self.stats.reindex(codes)
+        mean = stats['premium_mean'].to_numpy()
+        std = stats['premium_std'].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(std > 0, (premium - mean) / std, np.nan)
+        return pd.DataFrame({
+            "premium": premium,
+            "limit": limit,
+            "open": ((state == Status.OPEN) | (state == Status.LIMITED)) & (limit != 0),
+            "premium_mean": mean,
+            "premium_std": std,
+            "premium_z": z,
+            "premium_change": premium - stats['premium_prev'].to_numpy(),
+        }, index=codes)
+
+    def evaluate(self, funds_data):
+        """Return fired alerts as dicts (rule, when, code, name, premium, premium_z, limit)."""
+        if not self.rules or not funds_data:
+            return []
+        batch = funds_data if isinstance(funds_data, FundBatch) else FundBatch(funds_data)
+        frame = self.metrics(batch)
+        names = {r.code: r.name for r in batch.records}
+        alerts = []
+        for rule in self.rules:
+            mask = np.asarray(frame.eval(rule['when']), dtype=bool)
+            hits = frame[mask]
+            for code, row in zip(hits.index, hits.itertuples(index=False)):
+                alerts.append({
+                    "rule": rule.get('name') or rule['when'],
+                    "when": rule['when'],
+                    "code": code,
+                    "name": names[code],
+                    "premium": row.premium,
+                    "premium_z": row.premium_z,
+                    "limit": row.limit,
+                })
+        return alerts
+
+
+def format_alerts(alerts, shorten_name):
+    """Markdown message listing alerts grouped by rule."""
+    lines = ["# 基金溢价提醒", f"> 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}"]
+    rule = None
+    for alert in alerts:
+        if alert['rule'] != rule:
+            rule = alert['rule']
+            lines.append(f"\n## {rule}\n> 条件: `{alert['when']}`")
+        parts = [f"溢价 {alert['premium']:.2f}%" if not np.isnan(alert['premium']) else "溢价 -"]
+        if not np.isnan(alert['premium_z']):
+            parts.append(f"z={alert['premium_z']:.1f}")
+        parts.append(format_limit(alert['limit']))
+        lines.append(f"- {shorten_name(alert['name'])}({alert['code']}) " + " · ".join(parts))
+    return "\n".join(lines)
@@ -0,0 +1,162 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from records import format_limit
+
+PAUSED = -1
+
+
+def _load_matrix(store, value_sql, start=None):
+    """Load one observation column as a runs x codes DataFrame (see load_limit_matrix)."""
+    obs = pd.read_sql_query(
+        f"""SELECT o.run_id, o.code, {value_sql} AS value
+           FROM observations o JOIN runs r ON r.run_id = o.run_id
+           WHERE r.run_date >= ?""",
+        store.conn, params=(start or '0000-00-00',),
+    )
+    runs = pd.read_sql_query(
+        "SELECT run_id, run_date FROM runs WHERE run_date >= ? ORDER BY run_id",
+        store.conn, params=(start or '0000-00-00',),
+    )
+    matrix = obs.pivot(index='run_id', columns='code', values='value').reindex(runs['run_id'])
+
+    compacted = dict(store.conn.execute("SELECT month, members FROM compacted_months"))
+    if compacted:
+        months = runs['run_date'].str[:7].to_numpy()
+        in_compacted = np.isin(months, list(compacted))
+        if in_compacted.any():
+            filled = matrix.groupby(months).ffill()
+            tracked = np.isin(months, [month for month, members in compacted.items() if members])
+            if tracked.any():
+                # Don't fill funds into runs after they dropped out of the list
+                member = pd.DataFrame(False, index=matrix.index, columns=matrix.columns)
+                for code, first, last in store.conn.execute(
+                        "SELECT code, first_run, last_run FROM compacted_spans WHERE last_run >= ?",
+                        (int(runs['run_id'].iloc[0]),)):
+                    if code in member.columns:
+                        member.loc[first:last, code] = True
+                filled = filled.where(member.to_numpy() | ~tracked[:, None])
+            matrix[in_compacted] = filled[in_compacted]
+
+    matrix.index = pd.to_datetime(runs['run_date'].to_numpy())
+    return matrix
+
+
+def load_limit_matrix(store, start=None):
+    """Load limits from a HistoryStore as a runs x codes DataFrame.
+
+    Rows are runs (index: run_date, in run order), columns are fund codes.
+    Unlimited quotas are inf, paused funds -1 and missing observations NaN.
+    Rows dropped by compaction are forward-filled within their month.
+    """
+    return _load_matrix(store, "IFNULL(o.limit_val, 9e999)", start)
+
+
+def load_premium_matrix(store, start=None):
+    """Load premium rates (%) as a runs x codes DataFrame, NaN where not reported."""
+    matrix = _load_matrix(store, "o.premium_rate", start)
+    return matrix.dropna(axis=1, how='all').astype(float)
+
+
+def premium_stats(matrix, window=20, min_periods=5):
+    """Mean, standard deviation and latest value of each code's premium over the last window runs.
+
+    Codes with fewer than min_periods reported values get NaN mean/std.
+    """
+    tail = matrix.to_numpy(dtype=float)[-window:]
+    counts = (~np.isnan(tail)).sum(axis=0)
+    enough = counts >= min_periods
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.where(enough, np.nanmean(tail, axis=0), np.nan)
+        std = np.where(enough, np.nanstd(tail, axis=0, ddof=1), np.nan)
+    last = pd.DataFrame(tail).ffill().to_numpy()[-1] if tail.shape[0] else np.full(tail.shape[1], np.nan)
+    return pd.DataFrame({'premium_mean': mean, 'premium_std': std, 'premium_prev': last}, index=matrix.columns)
+
+
+def _last_true_index(mask):
+    """Index of the last True along axis 0 per column, -1 where none."""
+    rev = mask[::-1]
+    idx = mask.shape[0] - 1 - rev.argmax(axis=0)
+    return np.where(mask.any(axis=0), idx, -1)
+
+
+def compute_quota_analytics(matrix, window=20):
+    """Compute per-fund quota statistics for every code at once.
+
+    Returns a DataFrame indexed by code with:
+      days_since_pause  calendar days since the last paused run (0 if paused now)
+      last_reopen       date of the most recent paused -> open transition
+      rolling_min/max   min/max open quota over the last `window` runs
+      changes           number of limit changes between consecutive runs
+      change_rate       changes / number of consecutive observed pairs
+    """
+    values = matrix.to_numpy(dtype=float)
+    dates = matrix.index.to_numpy()
+    observed = ~np.isnan(values)
+    paused = values == PAUSED
+    columns = matrix.columns
+
+    if values.shape[0] == 0:
+        return pd.DataFrame(index=columns, columns=[
+            'days_since_pause', 'last_reopen', 'rolling_min', 'rolling_max', 'changes', 'change_rate'])
+
+    # Days since last pause, relative to the latest run
+    last_pause = _last_true_index(paused)
+    pause_dates = dates[np.maximum(last_pause, 0)]
+    days_since_pause = (dates[-1] - pause_dates) / np.timedelta64(1, 'D')
+    days_since_pause = np.where(last_pause >= 0, days_since_pause, np.nan)
+
+    # Most recent reopen: paused at t-1, observed and not paused at t (needs two runs)
+    if values.shape[0] < 2:
+        last_reopen = pd.to_datetime(np.full(values.shape[1], np.datetime64('NaT', 'ns')))
+    else:
+        reopen = paused[:-1] & observed[1:] & ~paused[1:]
+        last_reopen_idx = _last_true_index(reopen)
+        reopen_dates = dates[1:][np.maximum(last_reopen_idx, 0)]
+        last_reopen = pd.to_datetime(np.where(last_reopen_idx >= 0, reopen_dates, np.datetime64('NaT')))
+
+    # Rolling min/max over open (non-paused) quotas in the trailing window
+    tail = values[-window:]
+    open_tail = np.where(tail == PAUSED, np.nan, tail)
+    has_open = ~np.isnan(open_tail).all(axis=0)
+    with np.errstate(invalid='ignore'):
+        rolling_min = np.where(has_open, np.nanmin(np.where(has_open, open_tail, 0), axis=0), np.nan)
+        rolling_max = np.where(has_open, np.nanmax(np.where(has_open, open_tail, 0), axis=0), np.nan)
+
+    # Change frequency across consecutive observed runs
+    pairs = observed[:-1] & observed[1:]
+    changed = pairs & (values[:-1] != values[1:])
+    n_pairs = pairs.sum(axis=0)
+    changes = changed.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change_rate = np.where(n_pairs > 0, changes / n_pairs, np.nan)
+
+    return pd.DataFrame({
+        'days_since_pause': days_since_pause,
+        'last_reopen': last_reopen,
+        'rolling_min': rolling_min,
+        'rolling_max': rolling_max,
+        'changes': changes,
+        'change_rate': change_rate,
+    }, index=columns)
+
+
+def summarize(analytics, window=20):
+    """Return {code: short Chinese summary} for the report's 近况 column."""
+    summaries = {}
+    for code, row in zip(analytics.index, analytics.itertuples(index=False)):
+        parts = []
+        if not np.isnan(row.days_since_pause):
+            parts.append("暂停中" if row.days_since_pause == 0 else f"距上次暂停{int(row.days_since_pause)}天")
+        if not pd.isna(row.last_reopen):
+            parts.append(f"{row.last_reopen:%m-%d}恢复")
+        if not np.isnan(row.rolling_min):
+            lo, hi = format_limit(row.rolling_min), format_limit(row.rolling_max)
+            parts.append(f"近{window}次 {lo}" if lo == hi else f"近{window}次 {lo}~{hi}")
+        if not np.isnan(row.change_rate):
+            parts.append(f"变动率{row.change_rate:.0%}")
+        summaries[code] = " · ".join(parts)
+    return summaries
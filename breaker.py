@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one data source.
+
+    closed: calls go through; failure_threshold failures in a row open it.
+    open: calls are refused until reset_timeout seconds have passed, then
+    the breaker turns half-open and lets a single probe call through.
+    half-open: the probe's success closes the breaker, its failure opens
+    it again for another reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may be made now; claims the probe when half-open."""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self._probing = False
+                self.opened_at = self.clock()
+                self._transition(self.OPEN)
+
+    def _transition(self, state):
+        print(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
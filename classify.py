@@ -0,0 +1,193 @@
+"""Fund name classification shared by the monitor and update_funds.
+
+Index families and name-shortening rules are data (overridable with
+"classification" in config.json) compiled into one regex each. A Classifier
+memoizes results per fund code in a bounded cache persisted between runs,
+and offers a vectorized pandas path for update_funds that applies the same
+compiled rules.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_RULES = {
+    # Report groups in display order; for a name matching several, the first family wins
+    "index_families": [
+        {"name": "纳斯达克100", "keywords": ["纳斯达克", "纳指"]},
+        {"name": "标普500", "keywords": ["标普"]},
+    ],
+    # Applied by shorten_name, then a trailing "A" is dropped
+    "aliases": {"纳斯达克100": "纳指100"},
+    "strip": ["ETF联接", "指数", "发起式", "发起", "精选", "股票", "(LOF)"],
+}
+DEFAULT_INDEX_TYPE = "其他"
+
+# Share-class suffix, e.g. "...(QDII)A", "...C人民币", "...A(美元现汇)"; wrapper tags are stripped first
+SHARE_WRAPPER_RE = re.compile(r'ETF|LOF|FOF|QDII')
+SHARE_CLASS_RE = re.compile(r'([A-Z])[^A-Za-z]*$')
+
+# Name markers of USD share classes (美元现汇/美元现钞/美钞/美汇)
+USD_RE = re.compile(r'美元|美钞|美汇')
+
+# Code prefixes of funds listed on the Shanghai/Shenzhen exchanges (ETFs and LOFs)
+EXCHANGE_PREFIXES = ("15", "16", "50", "51", "52", "56", "58")
+
+
+def share_class(name):
+    """Share class letter of a fund name ("A", "C", ...), or "" when there is none."""
+    match = SHARE_CLASS_RE.search(SHARE_WRAPPER_RE.sub('', name))
+    return match.group(1) if match else ""
+
+
+def currency(name):
+    return "美元" if USD_RE.search(name) else "人民币"
+
+
+def exchange_traded(code):
+    return code.startswith(EXCHANGE_PREFIXES)
+
+
+class Classifier:
+    """Compiled classification rules with a per-code memo.
+
+    classify(code, name) returns a dict with name, short_name, index_type,
+    share_class, currency and exchange_traded. Results are cached per code
+    (recomputed when the name changes), bounded to max_entries in LRU order
+    and saved to cache_path. The cache is discarded when the rules change.
+    """
+
+    def __init__(self, rules=None, cache_path=None, max_entries=5000):
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.families = [f['name'] for f in self.rules['index_families']]
+        self.index_types = self.families + [DEFAULT_INDEX_TYPE]
+        self.fingerprint = hashlib.sha1(
+            json.dumps(self.rules, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+        # One alternation with a named group per family: f0, f1, ...
+        self._index_re = re.compile("|".join(
+            f"(?P<f{i}>{'|'.join(map(re.escape, f['keywords']))})"
+            for i, f in enumerate(self.rules['index_families'])
+        ) or r'(?!)')
+        self._replacements = {kw: "" for kw in self.rules['strip']}
+        self._replacements.update(self.rules['aliases'])
+        # Longest first, so "发起式" is preferred over "发起"
+        self._shorten_re = re.compile("|".join(
+            re.escape(kw) for kw in sorted(self._replacements, key=len, reverse=True)
+        ) or r'(?!)')
+
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if cache_path:
+            self._load()
+
+    def index_type(self, name):
+        best = None
+        for match in self._index_re.finditer(name):
+            family = int(match.lastgroup[1:])
+            if best is None or family < best:
+                best = family
+                if best == 0:
+                    break
+        return self.families[best] if best is not None else DEFAULT_INDEX_TYPE
+
+    def shorten_name(self, name):
+        name = self._shorten_re.sub(lambda m: self._replacements[m.group(0)], name)
+        if name.endswith("A"):
+            name = name[:-1]
+        return name
+
+    def _compute(self, code, name):
+        return {
+            "name": name,
+            "short_name": self.shorten_name(name),
+            "index_type": self.index_type(name),
+            "share_class": share_class(name),
+            "currency": currency(name),
+            "exchange_traded": exchange_traded(code),
+        }
+
+    def _put(self, code, entry):
+        self._cache[code] = entry
+        self._cache.move_to_end(code)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        self._dirty = True
+
+    def classify(self, code, name):
+        with self._lock:
+            entry = self._cache.get(code)
+            if entry is not None and entry['name'] == name:
+                self._cache.move_to_end(code)
+                return entry
+        entry = self._compute(code, name)
+        with self._lock:
+            self._put(code, entry)
+        return entry
+
+    def seed(self, fund_index):
+        """Preload entries from a fund_index.json built with the same rules."""
+        if not fund_index or fund_index.get('rules') != self.fingerprint:
+            return 0
+        with self._lock:
+            for code, entry in fund_index.get('funds', {}).items():
+                if code not in self._cache:
+                    self._put(code, entry)
+        return len(fund_index.get('funds', {}))
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading {self.cache_path}: {e}")
+            return
+        if data.get('rules') == self.fingerprint:
+            for code, entry in data.get('entries', {}).items():
+                self._put(code, entry)
+        self._dirty = False
+
+    def save(self):
+        if not self.cache_path or not self._dirty:
+            return
+        with self._lock:
+            data = {"rules": self.fingerprint, "entries": dict(self._cache)}
+            self._dirty = False
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error saving {self.cache_path}: {e}")
+
+    def classify_frame(self, codes, names):
+        """Vectorized classification of pandas Series of codes and names.
+
+        Returns a DataFrame indexed like names with the same columns as
+        classify() apart from name.
+        """
+        import numpy as np
+        import pandas as pd
+
+        short = names.str.replace(self._shorten_re, lambda m: self._replacements[m.group(0)], regex=True)
+        short = short.where(~short.str.endswith("A"), short.str[:-1])
+
+        masks = [names.str.contains("|".join(map(re.escape, f['keywords'])), regex=True)
+                 for f in self.rules['index_families']]
+        index_types = np.select(masks, self.families, default=DEFAULT_INDEX_TYPE) if masks else DEFAULT_INDEX_TYPE
+
+        return pd.DataFrame({
+            "short_name": short,
+            "index_type": index_types,
+            "share_class": names.str.replace(SHARE_WRAPPER_RE, '', regex=True).str.extract(SHARE_CLASS_RE, expand=False).fillna(""),
+            "currency": np.where(names.str.contains(USD_RE, regex=True), "美元", "人民币"),
+            "exchange_traded": codes.str.startswith(EXCHANGE_PREFIXES),
+        }, index=names.index)
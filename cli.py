@@ -0,0 +1,209 @@
+"""Command-line entry point behind `python monitor.py`.
+
+    python monitor.py [run]            fetch, report, notify and save history
+    python monitor.py fetch            fetch and save history only
+    python monitor.py report           render the latest stored run
+    python monitor.py notify           send the latest stored run's report and alerts
+    python monitor.py export           write the static dashboard for the latest stored run
+    python monitor.py watch            intraday polling
+    python monitor.py update-universe  refresh the fund list (update_funds.py)
+
+Each command imports only the modules it uses: report/notify never load
+the HTTP or page-parsing stack, update-universe never loads the monitor.
+"""
+import argparse
+import sys
+
+
+def _monitor_options(suppress):
+    """Options shared by the monitor commands.
+
+    Accepted both before and after the command name; subcommand copies
+    default to SUPPRESS so they don't overwrite a value given before it.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+
+    parser.add_argument('--no-cache', action='store_true', default=default(False),
+                        help="bypass the on-disk HTTP response cache")
+    parser.add_argument('--purge-cache', action='store_true', default=default(False),
+                        help="delete the HTTP response cache before running")
+    parser.add_argument('--incremental', action='store_true', default=default(False),
+                        help="only re-fetch funds whose state is likely to have changed")
+    parser.add_argument('--shards', type=int, metavar='N', default=default(None),
+                        help="spread per-fund fetches over N worker processes")
+    parser.add_argument('--profile', nargs='?', const='monitor.prof', metavar='FILE', default=default(None),
+                        help="write cProfile stats of the command to FILE (default: monitor.prof)")
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="monitor.py", description="Fund purchase limit monitor", parents=[_monitor_options(False)])
+    # Pre-subcommand flags, kept for existing scripts and workflows
+    parser.add_argument('--watch', action='store_true', help="same as the watch command")
+    parser.add_argument('--watch-until', metavar='HH:MM', help="stop watch mode at this local time")
+
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    options = [_monitor_options(True)]
+    commands.add_parser('run', parents=options, help="fetch, report, notify and save history (default)")
+    commands.add_parser('fetch', parents=options, help="fetch all funds and save the run to history, without notifying")
+
+    report = commands.add_parser('report', parents=options, help="render the latest stored run")
+    report.add_argument('--format', choices=('md', 'html'), default='md', help="output format (default: md)")
+    report.add_argument('--output', '-o', metavar='FILE', help="write to FILE instead of stdout")
+
+    notify = commands.add_parser('notify', parents=options,
+                                 help="send the latest stored run's report, digests and alerts")
+    notify.add_argument('--flush-only', action='store_true',
+                        help="only retry notifications left in the outbox")
+
+    export = commands.add_parser('export', parents=options,
+                                 help="write the static dashboard (index and per-fund pages) for the latest stored run")
+    export.add_argument('--output', '-o', metavar='DIR',
+                        help="output directory (default: config dashboard_dir, else site)")
+    export.add_argument('--force', action='store_true', help="re-render every page, ignoring the manifest")
+
+    watch = commands.add_parser('watch', parents=options, help="poll intraday and notify on quota changes")
+    watch.add_argument('--until', metavar='HH:MM', dest='watch_until', default=argparse.SUPPRESS,
+                       help="stop at this local time")
+
+    universe = commands.add_parser('update-universe', help="refresh the monitored fund list")
+    universe.add_argument('--refresh', action='store_true', help="ignore the cached fund list and download it again")
+    universe.add_argument('--max-age', type=float, default=20, metavar='HOURS',
+                          help="reuse the cached fund list if younger than this")
+    universe.add_argument('--dry-run', action='store_true', help="only print the changes")
+    return parser
+
+
+def _make_monitor(args):
+    from monitor import FundMonitor
+
+    monitor = FundMonitor(use_cache=not args.no_cache, incremental=args.incremental, shards=args.shards)
+    if args.purge_cache:
+        monitor.http_cache.purge()
+        print("HTTP response cache purged.")
+    return monitor
+
+
+def cmd_run(args):
+    _make_monitor(args).run()
+    return 0
+
+
+def cmd_fetch(args):
+    monitor = _make_monitor(args)
+    funds_data = monitor.fetch()
+    with monitor.telemetry.span("history.save"):
+        monitor._save_history(funds_data)
+    monitor.close()
+    monitor.telemetry.print_summary()
+    if monitor.summary_file:
+        monitor.telemetry.write_summary(monitor.summary_file, {"sources": monitor.pipeline.stats})
+    return 0
+
+
+def cmd_report(args):
+    monitor = _make_monitor(args)
+    funds_data = monitor.stored_run()
+    if funds_data is None:
+        print("No stored runs yet; run `monitor.py fetch` first.", file=sys.stderr)
+        return 1
+    model = monitor.build_report_model(funds_data, monitor.quota_notes())
+    if args.format == 'html':
+        text = monitor.generate_html_report(funds_data, model)
+    else:
+        text = monitor.generate_report(funds_data, model)
+    monitor.classifier.save()
+    if not args.output:
+        sys.stdout.write(text + "\n")
+        return 0
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(text)
+    print(f"Report written to {args.output}.")
+    return 0
+
+
+def cmd_notify(args):
+    monitor = _make_monitor(args)
+    try:
+        if args.flush_only:
+            delivered = monitor.notifier.flush()
+            print(f"Outbox flushed: {delivered or 'nothing due'}.")
+            return 0
+        funds_data = monitor.stored_run()
+        if funds_data is None:
+            print("No stored runs yet; run `monitor.py fetch` first.", file=sys.stderr)
+            return 1
+        monitor.publish(funds_data, exclude_latest=True)
+        return 0
+    finally:
+        monitor.close()
+
+
+def cmd_export(args):
+    monitor = _make_monitor(args)
+    funds_data = monitor.stored_run()
+    if funds_data is None:
+        print("No stored runs yet; run `monitor.py fetch` first.", file=sys.stderr)
+        return 1
+    model = monitor.build_report_model(funds_data)
+    monitor.classifier.save()
+    out_dir = args.output or monitor.config.get('dashboard_dir') or 'site'
+    return 0 if monitor.export_dashboard(model, out_dir, args.force) is not None else 1
+
+
+def cmd_watch(args):
+    _make_monitor(args).watch(until=args.watch_until)
+    return 0
+
+
+def cmd_update_universe(args):
+    from update_funds import update_fund_list
+
+    if update_fund_list(args.max_age, args.refresh, args.dry_run):
+        print("Update process completed successfully.")
+        return 0
+    print("Update process failed.")
+    return 1
+
+
+HANDLERS = {
+    "run": cmd_run,
+    "fetch": cmd_fetch,
+    "report": cmd_report,
+    "notify": cmd_notify,
+    "export": cmd_export,
+    "watch": cmd_watch,
+    "update-universe": cmd_update_universe,
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    command = args.command or ("watch" if args.watch else "run")
+
+    profiler = None
+    if getattr(args, 'profile', None):
+        # Profiles the main thread; per-fund fetch workers show up as time waiting on their futures
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        status = HANDLERS[command](args)
+    finally:
+        if profiler:
+            import pstats
+
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"cProfile stats written to {args.profile}.")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
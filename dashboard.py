@@ -0,0 +1,311 @@
+"""Static dashboard: an index page plus one page per fund, with chart series.
+
+Layout of the output directory:
+
+    index.html              every fund, grouped like the HTML report
+    funds/<code>.html       current state and quota/premium history
+    series/<code>.json      {"code", "name", "date": [...], "status": [...],
+                             "limit": [...], "premium": [...]}, one entry per
+                             change point; limit null = unlimited, -1 = paused
+    series/<code>.csv       the same points as date,status,limit,premium
+                            (empty limit = unlimited, empty premium = none)
+    manifest.json           sha1 of every file, and of every fund's inputs
+
+Pages are built from the report model (build_report_model) and from the
+history store. A fund's history is kept as change points (a row only when
+its status, limit or premium differs from the row before), so a fund whose
+state didn't change produces the same inputs run after run. Funds whose
+input hash matches the manifest are not rendered at all; rendered files are
+only written when their content hash differs from the manifest. A daily run
+therefore rewrites the index, the manifest and the files of the funds that
+changed.
+"""
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+from string import Template
+
+from records import UNLIMITED, format_limit
+
+MANIFEST_FILE = 'manifest.json'
+
+# Bump when the page or series format changes, to re-render every fund once
+FORMAT_VERSION = 3
+
+# History rows shown on a fund page (newest first); the series files keep all
+PAGE_HISTORY_ROWS = 60
+
+# Report row fields shown on a fund page. The 近况 note is left out: it is
+# recomputed every run and would make every page change every day.
+PAGE_FIELDS = ("name", "full_name", "code", "share_class", "index_type", "category", "status",
+               "paused", "disp_limit", "direction", "change_text", "premium_rate", "stale_as_of")
+
+
+def load_series(store):
+    """Return {code: [(run_date, status, limit_val, premium_rate)]} change points from history.
+
+    One pass over the store for all funds. Premium rates are rounded to the
+    two decimals shown, so sub-display noise doesn't count as a change.
+    """
+    series = {}
+    for code, run_date, obs, _stale in store.recent_observations('0000-00-00'):
+        premium = obs['premium_rate']
+        point = (run_date, obs['status'], obs['limit_val'], None if premium is None else round(premium, 2))
+        points = series.get(code)
+        if points is None:
+            points = series[code] = []
+        elif points[-1][1:] == point[1:]:
+            continue
+        points.append(point)
+    return series
+
+
+def _format_premium(rate):
+    return "N/A" if rate is None else f"{rate:.2f}%"
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+# --- Templates ---
+
+PAGE_HEAD = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>$title</title>
+<style>
+body { margin: 0; padding: 20px; background: #f4f7f9; color: #2d3748; font-family: 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; }
+main { max-width: 800px; margin: 0 auto; background: #fff; border-radius: 12px; padding: 30px; box-shadow: 0 10px 25px rgba(0,0,0,0.05); }
+h1 { margin: 0 0 8px 0; font-size: 24px; color: #1a365d; }
+h2 { font-size: 18px; border-bottom: 2px solid #edf2f7; padding-bottom: 6px; }
+h3 { font-size: 15px; color: #4a5568; }
+table { width: 100%; border-collapse: collapse; margin-bottom: 10px; }
+th { text-align: left; padding: 10px 8px; font-size: 13px; color: #718096; background: #f8fafc; }
+td { padding: 10px 8px; font-size: 14px; border-bottom: 1px solid #edf2f7; }
+a { color: #2c5282; text-decoration: none; }
+.meta { color: #a0aec0; font-size: 13px; margin: 0 0 20px 0; }
+.up { color: #38a169; font-weight: bold; } .down { color: #e53e3e; font-weight: bold; }
+.paused { color: #e53e3e; } .high { color: #e53e3e; } .discount { color: #38a169; }
+</style>
+</head>
+<body><main>
+""")
+
+PAGE_FOOT = """
+<p class="meta">数据源: 集思录 / 天天基金网 | 仅供个人参考</p>
+</main></body>
+</html>
+"""
+
+INDEX_ROW = Template("""<tr><td><a href="funds/$code.html">$name</a> <span class="meta">$code</span></td>"""
+                     """<td$status_class>$status</td><td>$disp_limit</td><td>$change</td><td$premium_class>$premium</td></tr>
+""")
+
+FUND_SUMMARY = Template("""<h1>$name</h1>
+<p class="meta">$code · $index_type · $share_class类 · <a href="../index.html">返回总览</a></p>
+<table>
+<tr><th>当前状态</th><td$status_class>$status$stale</td></tr>
+<tr><th>今日限额</th><td>$disp_limit</td></tr>
+<tr><th>较上次变化</th><td>$change</td></tr>
+<tr><th>溢价率</th><td$premium_class>$premium</td></tr>
+</table>
+<h2>历史变动</h2>
+<p class="meta">仅列出状态、限额或溢价率发生变化的记录（最近 $shown 条，共 $total 条）。
+完整序列: <a href="../series/$code.json">JSON</a> · <a href="../series/$code.csv">CSV</a></p>
+<table>
+<tr><th>日期</th><th>状态</th><th>限额</th><th>溢价率</th></tr>
+""")
+
+HISTORY_ROW = Template("<tr><td>$date</td><td>$status</td><td>$limit</td><td>$premium</td></tr>\n")
+
+
+def _status_class(row):
+    return ' class="paused"' if row['paused'] else ""
+
+
+def _premium_class(rate):
+    if rate is None:
+        return ""
+    if rate > 1:
+        return ' class="high"'
+    return ' class="discount"' if rate < 0 else ""
+
+
+def _change_html(row):
+    if row['direction'] in ("up", "down"):
+        arrow = "↑" if row['direction'] == "up" else "↓"
+        return f'<span class="{row["direction"]}">{arrow} {html.escape(row["change_text"])}</span>'
+    return "-"
+
+
+def render_index(model):
+    """Render index.html from the report model."""
+    out = io.StringIO()
+    write = out.write
+    write(PAGE_HEAD.substitute(title="基金申购限额总览"))
+    write(f"<h1>基金申购限额总览</h1>\n<p class=\"meta\">更新时间: {html.escape(model['generated_at'])}</p>\n")
+    for section in model['sections']:
+        write(f"<h2>{html.escape(section['title'])}</h2>\n")
+        for group in section['groups']:
+            write(f"<h3>{html.escape(group['index'])}</h3>\n<table>\n"
+                  "<tr><th>基金名称</th><th>当前状态</th><th>今日限额</th><th>较昨日变化</th><th>溢价率</th></tr>\n")
+            for row in group['rows']:
+                write(INDEX_ROW.substitute(
+                    code=html.escape(row['code']),
+                    name=html.escape(row['name']),
+                    status=html.escape(row['status']),
+                    status_class=_status_class(row),
+                    disp_limit=html.escape(str(row['disp_limit'])),
+                    change=_change_html(row),
+                    premium=_format_premium(row['premium_rate']),
+                    premium_class=_premium_class(row['premium_rate']),
+                ))
+            write("</table>\n")
+    write(PAGE_FOOT)
+    return out.getvalue()
+
+
+def render_fund_page(row, points):
+    """Render funds/<code>.html for a report row and its change points."""
+    out = io.StringIO()
+    write = out.write
+    shown = points[-PAGE_HISTORY_ROWS:][::-1]
+    write(PAGE_HEAD.substitute(title=html.escape(f"{row['full_name']} ({row['code']})")))
+    write(FUND_SUMMARY.substitute(
+        name=html.escape(row['full_name']),
+        code=html.escape(row['code']),
+        index_type=html.escape(row['index_type']),
+        share_class=html.escape(row['share_class'] or "-"),
+        status=html.escape(row['status']),
+        status_class=_status_class(row),
+        stale=f"（沿用 {html.escape(row['stale_as_of'])}）" if row['stale_as_of'] else "",
+        disp_limit=html.escape(str(row['disp_limit'])),
+        change=_change_html(row),
+        premium=_format_premium(row['premium_rate']),
+        premium_class=_premium_class(row['premium_rate']),
+        shown=len(shown),
+        total=len(points),
+    ))
+    for run_date, status, limit_val, premium in shown:
+        write(HISTORY_ROW.substitute(
+            date=run_date,
+            status=html.escape(status or "-"),
+            limit=format_limit(limit_val),
+            premium=_format_premium(premium),
+        ))
+    write("</table>\n")
+    write(PAGE_FOOT)
+    return out.getvalue()
+
+
+def render_series_json(row, points):
+    return json.dumps({
+        "code": row['code'],
+        "name": row['full_name'],
+        "date": [p[0] for p in points],
+        "status": [p[1] for p in points],
+        "limit": [None if p[2] == UNLIMITED else p[2] for p in points],
+        "premium": [p[3] for p in points],
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def render_series_csv(points):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(("date", "status", "limit", "premium"))
+    # Empty limit = unlimited, as null in the JSON series
+    writer.writerows((run_date, status, "" if limit_val == UNLIMITED else limit_val, premium)
+                     for run_date, status, limit_val, premium in points)
+    return out.getvalue()
+
+
+class DashboardExporter:
+    """Incrementally write the static dashboard to out_dir."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        path = os.path.join(self.out_dir, MANIFEST_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"version": FORMAT_VERSION, "funds": {}, "files": {}}
+        except Exception as e:
+            print(f"Error loading {path}: {e}; regenerating the dashboard.")
+            return {"version": FORMAT_VERSION, "funds": {}, "files": {}}
+        if manifest.get('version') != FORMAT_VERSION:
+            return {"version": FORMAT_VERSION, "funds": {}, "files": manifest.get('files', {})}
+        return manifest
+
+    def _write(self, relpath, text, files, stats):
+        """Record text as relpath in files; write it only when its hash changed."""
+        data = text.encode('utf-8')
+        digest = _sha1(data)
+        files[relpath] = digest
+        path = os.path.join(self.out_dir, relpath)
+        if self.manifest['files'].get(relpath) == digest and os.path.exists(path):
+            stats['unchanged'] += 1
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        stats['written'] += 1
+
+    def export(self, model, series, force=False):
+        """Write pages for model's rows, using series from load_series().
+
+        force re-renders every fund regardless of the manifest. Returns
+        {"rendered", "written", "unchanged", "removed"} counts.
+        """
+        stats = {"rendered": 0, "written": 0, "unchanged": 0, "removed": 0}
+        old_funds, old_files = self.manifest['funds'], self.manifest['files']
+        funds, files = {}, {}
+
+        for section in model['sections']:
+            for group in section['groups']:
+                for row in group['rows']:
+                    code = row['code']
+                    points = series.get(code, [])
+                    fingerprint = _sha1(json.dumps(
+                        [[row[key] for key in PAGE_FIELDS], points], ensure_ascii=False).encode('utf-8'))
+                    funds[code] = fingerprint
+                    relpaths = (f"funds/{code}.html", f"series/{code}.json", f"series/{code}.csv")
+                    if (not force and old_funds.get(code) == fingerprint
+                            and all(p in old_files and os.path.exists(os.path.join(self.out_dir, p)) for p in relpaths)):
+                        for relpath in relpaths:
+                            files[relpath] = old_files[relpath]
+                        stats['unchanged'] += len(relpaths)
+                        continue
+                    stats['rendered'] += 1
+                    self._write(relpaths[0], render_fund_page(row, points), files, stats)
+                    self._write(relpaths[1], render_series_json(row, points), files, stats)
+                    self._write(relpaths[2], render_series_csv(points), files, stats)
+
+        self._write("index.html", render_index(model), files, stats)
+
+        # Funds no longer monitored
+        for relpath in old_files.keys() - files.keys():
+            try:
+                os.remove(os.path.join(self.out_dir, relpath))
+                stats['removed'] += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing {relpath}: {e}")
+
+        manifest = {"version": FORMAT_VERSION, "funds": funds, "files": files}
+        if manifest != self.manifest:
+            self._write(MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True), {}, stats)
+            self.manifest = manifest
+        return stats
@@ -0,0 +1,97 @@
+"""Cold-start benchmark for the monitor's entry points.
+
+Starts a fresh interpreter per sample for each target (bare imports and CLI
+--help invocations), reports wall-clock latency, and lists the slowest
+modules from `python -X importtime` for `import monitor` together with any
+heavy dependency that got loaded at import time.
+
+Usage: python -m devtools.bench_import [--repeat N] [--top N] [--output import_results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from devtools.bench_suite import git_commit, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "import monitor": ["-c", "import monitor"],
+    "import update_funds": ["-c", "import update_funds"],
+    "monitor.py --help": ["monitor.py", "--help"],
+    "monitor.py report --help": ["monitor.py", "report", "--help"],
+}
+
+# Modules that should only be imported by the commands that use them
+HEAVY_MODULES = ["requests", "bs4", "markdown", "smtplib", "email.mime", "asyncio",
+                 "numpy", "pandas", "akshare"]
+
+
+def cold_start(args, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def import_profile(statement="import monitor"):
+    """Parse -X importtime output into [(module, self_us, cumulative_us)]."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=10)
+    arg_parser.add_argument('--top', type=int, default=10, help="slowest modules to list")
+    arg_parser.add_argument('--output', help="write the results to this JSON file")
+    args = arg_parser.parse_args()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    # Discarded warm-up so every target reads from the same (warm) bytecode and page cache
+    cold_start(TARGETS["import monitor"], 1)
+    for name, target in TARGETS.items():
+        stats = summarize(cold_start(target, args.repeat), 1)
+        results['results'][name] = stats
+        print(f"  {name:<28} min {stats['min_ms']:>8.1f} ms  p50 {stats['p50_ms']:>8.1f} ms")
+
+    rows = import_profile()
+    loaded = {module for module, _, _ in rows}
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+    results['eager_heavy_modules'] = heavy
+    print(f"\nHeavy modules loaded by `import monitor`: {', '.join(heavy) or 'none'}")
+    print("Slowest modules (cumulative) for `import monitor`:")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {module:<40} {cumulative_us / 1000:>8.1f} ms  (self {self_us / 1000:.1f} ms)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare the fast jbgk extractor against the full BeautifulSoup parse.
+
+Usage: python -m devtools.bench_parse [--repeat N]
+"""
+import argparse
+import glob
+import os
+import time
+
+from eastmoney_parser import parse_jbgk_fast, parse_jbgk_soup
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixtures():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'jbgk_*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def time_parser(parser, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parser(page)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=50)
+    args = arg_parser.parse_args()
+
+    pages = load_fixtures()
+    for name, page in pages.items():
+        fast, soup = parse_jbgk_fast(page), parse_jbgk_soup(page)
+        match = "OK" if fast == soup else "MISMATCH"
+        print(f"{name}: fast={fast} soup={soup} [{match}]")
+
+    fast_t = time_parser(parse_jbgk_fast, list(pages.values()), args.repeat)
+    soup_t = time_parser(parse_jbgk_soup, list(pages.values()), args.repeat)
+    print(f"fast: {fast_t * 1e6:.1f} us/page")
+    print(f"soup: {soup_t * 1e6:.1f} us/page")
+    print(f"speedup: {soup_t / fast_t:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
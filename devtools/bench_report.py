@@ -0,0 +1,51 @@
+"""Benchmark report model building and the Markdown/HTML renderers.
+
+The monitor runs in a scratch directory with a copy of config.json.
+
+Usage: python -m devtools.bench_report [--funds N] [--repeat N]
+"""
+import argparse
+import io
+import time
+
+from devtools.synthetic import make_funds, make_history, scratch_workdir
+from monitor import FundMonitor
+from report import render_html, render_markdown
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--funds', type=int, default=5000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    funds = make_funds(args.funds)
+    with scratch_workdir():
+        monitor = FundMonitor()
+        monitor.history = make_history(funds)
+        model_t, model = timed(lambda: monitor.build_report_model(funds), args.repeat)
+        monitor.history_store.close()
+
+    def render(renderer):
+        out = io.StringIO()
+        renderer(model, out)
+        return out.getvalue()
+
+    md_t, md = timed(lambda: render(render_markdown), args.repeat)
+    html_t, html = timed(lambda: render(render_html), args.repeat)
+
+    print(f"funds: {args.funds}")
+    print(f"model:    {model_t * 1000:.1f} ms")
+    print(f"markdown: {md_t * 1000:.1f} ms ({len(md)} chars)")
+    print(f"html:     {html_t * 1000:.1f} ms ({len(html)} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Offline benchmark suite for the fetch, parse and render paths.
+
+Replays recorded Jisilu JSON and jbgk HTML fixtures through a local
+stand-in server and writes the timings to a JSON file that can be compared
+against a previous run. The monitor runs in a scratch directory with a copy
+of config.json, so history.db and the caches are left alone.
+
+Usage: python -m devtools.bench_suite [--sizes 10,150,5000] [--repeat N]
+                                      [--output bench_results.json] [--compare OLD.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+from devtools.replay_server import ReplayServer, redirect_client
+from devtools.synthetic import make_funds, make_history, scratch_workdir
+from monitor import FundMonitor
+
+AMOUNT_TEXTS = ["10元", "100元", "1000元", "1万元", "5万元", "50万元", "1千万元", "0.5万元", "None", ""]
+
+# Ratio of best-of-N latency versus the compared run above which a result is flagged
+REGRESSION_RATIO = 1.2
+
+
+def summarize(samples, items_per_sample):
+    """Latency stats in milliseconds plus throughput in items per second."""
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        "samples": len(ordered),
+        "mean_ms": round(mean * 1000, 4),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "throughput": round(items_per_sample / mean, 1) if mean > 0 else None,
+    }
+
+
+def sample(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_size(monitor, n, repeat):
+    funds = make_funds(n)
+    codes = [f['code'] for f in funds]
+    server = ReplayServer(codes).start()
+    redirect_client(monitor.http, server.base_url, pool_size=monitor.fetch_workers)
+    results = {}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            jisilu = monitor.fetch_jisilu_qdii_data()
+            assert len(jisilu) == n, f"expected {n} Jisilu rows, got {len(jisilu)}"
+            results['fetch_jisilu_qdii_data'] = summarize(
+                sample(monitor.fetch_jisilu_qdii_data, repeat), n)
+
+            # One fresh page scrape per fund; empty bulk data forces the per-fund path
+            samples = []
+            for fund in funds:
+                start = time.perf_counter()
+                monitor.fetch_fund_info(fund['code'], fund['name'], jisilu_data={}, eastmoney_data={})
+                samples.append(time.perf_counter() - start)
+            results['fetch_fund_info'] = summarize(samples, 1)
+
+        texts = [AMOUNT_TEXTS[i % len(AMOUNT_TEXTS)] for i in range(n)]
+        results['_parse_amount'] = summarize(
+            sample(lambda: [monitor._parse_amount(t) for t in texts], repeat), n)
+
+        monitor.history = make_history(funds)
+        results['generate_report'] = summarize(
+            sample(lambda: monitor.generate_report(funds), repeat), n)
+        results['generate_html_report'] = summarize(
+            sample(lambda: monitor.generate_html_report(funds), repeat), n)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Print best-of-N latency of current versus previous results, flagging regressions.
+
+    The minimum is compared rather than the mean as it is the least noisy
+    on a shared machine.
+    """
+    print(f"\nvs {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+    for name, by_size in current['results'].items():
+        for size, stats in by_size.items():
+            old = previous['results'].get(name, {}).get(size)
+            if not old:
+                continue
+            ratio = stats['min_ms'] / old['min_ms'] if old['min_ms'] else float('inf')
+            flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+            print(f"  {name:<22} n={size:<5} {old['min_ms']:>10.3f} -> {stats['min_ms']:>10.3f} ms ({ratio:.2f}x){flag}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', default='10,150,5000', help="comma-separated fund counts")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--output', default='bench_results.json')
+    arg_parser.add_argument('--compare', metavar='FILE', help="previous results to compare against")
+    args = arg_parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    current = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    with scratch_workdir():
+        monitor = FundMonitor(use_cache=False)
+        monitor.http.rate_limit = 0  # no pacing against the local server
+        for n in (int(s) for s in args.sizes.split(',')):
+            print(f"Benchmarking {n} funds...")
+            for name, stats in bench_size(monitor, n, args.repeat).items():
+                current['results'].setdefault(name, {})[str(n)] = stats
+                print(f"  {name:<22} mean {stats['mean_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms  "
+                      f"{stats['throughput']}/s")
+        monitor.http.close()
+        monitor.history_store.close()
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {output}.")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(current, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Local fake SMTP and WeChat-webhook servers for exercising notifications.
+
+Usage: python -m devtools.fake_notify [--smtp-port 2525] [--webhook-port 8025] [--fail-rate 0.3]
+
+Then point the monitor at them, e.g.:
+  SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=0 EMAIL_SENDER=bot@test \
+  EMAIL_PASSWORD=x EMAIL_RECEIVER=a@test,b@test WEBHOOK_URL=http://127.0.0.1:8025/send \
+  python monitor.py
+"""
+import argparse
+import http.server
+import json
+import random
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages from smtplib (EHLO, AUTH, MAIL, RCPT, DATA)."""
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self._reply("220 fake-smtp ready")
+        mail_from, rcpts = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip("\r\n")
+            cmd = line.split(" ", 1)[0].upper()
+            if cmd in ("EHLO", "HELO"):
+                self._reply("250-fake-smtp")
+                self._reply("250-AUTH PLAIN LOGIN")
+                self._reply("250 8BITMIME")
+            elif cmd == "AUTH":
+                self._reply("235 2.7.0 Authentication successful")
+            elif cmd == "MAIL":
+                mail_from, rcpts = line[10:].strip("<>"), []
+                self._reply("250 OK")
+            elif cmd == "RCPT":
+                rcpts.append(line[8:].strip("<>"))
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                if random.random() < server.fail_rate:
+                    self._reply("451 4.3.0 Temporary failure (fake)")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline().decode('utf-8', 'replace')
+                    if data_line in (".\r\n", ".\n", ""):
+                        break
+                    lines.append(data_line)
+                server.messages.append({"from": mail_from, "to": rcpts, "data": "".join(lines)})
+                print(f"[fake-smtp] message from {mail_from} to {', '.join(rcpts)} ({sum(map(len, lines))} bytes)")
+                self._reply("250 OK queued")
+            elif cmd in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=2525, fail_rate=0.0):
+        super().__init__((host, port), _SMTPHandler)
+        self.fail_rate = fail_rate
+        self.messages = []
+        self.connections = 0
+
+
+class _WebhookHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if random.random() < self.server.fail_rate:
+            self.send_response(random.choice([429, 500, 503]))
+            self.end_headers()
+            return
+        self.server.messages.append(json.loads(body or b'{}'))
+        print(f"[fake-webhook] message ({len(body)} bytes)")
+        payload = json.dumps({"errcode": 0, "errmsg": "ok"}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeWebhookServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=8025, fail_rate=0.0):
+        super().__init__((host, port), _WebhookHandler)
+        self.fail_rate = fail_rate
+        self.messages = []
+
+
+def start_in_background(server):
+    """Serve in a daemon thread and return the server."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--smtp-port', type=int, default=2525)
+    arg_parser.add_argument('--webhook-port', type=int, default=8025)
+    arg_parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of deliveries to reject")
+    args = arg_parser.parse_args()
+
+    start_in_background(FakeSMTPServer(port=args.smtp_port, fail_rate=args.fail_rate))
+    start_in_background(FakeWebhookServer(port=args.webhook_port, fail_rate=args.fail_rate))
+    print(f"Fake SMTP on 127.0.0.1:{args.smtp_port}, webhook on http://127.0.0.1:{args.webhook_port}/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
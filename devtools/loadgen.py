@@ -0,0 +1,190 @@
+"""Load generator: a full FundMonitor run against the local fake upstream.
+
+Starts devtools.replay_server in its own process with the requested fault
+profile, runs FundMonitor.run() for N synthetic funds in a scratch
+directory (own config.json, history.db and caches; notifications
+disabled), then reports per-fund and Jisilu fetch latency (p50/p99),
+throughput, retries, how funds were resolved, the server's request
+counters and the client's peak memory.
+
+Usage: python -m devtools.loadgen [--funds 500] [--etf-share 0.3] [--workers 8] [--rate-limit 0]
+                                  [--read-timeout 30] [--retries 3] [--deadline 300]
+                                  [--latency SPEC] [--error-rate P] [--throttle-rate P]
+                                  [--slowloris-rate P] [--output loadgen.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _serve(conn, codes, fault_args):
+    from devtools.replay_server import ReplayServer, fault_profile
+
+    server = ReplayServer(codes, faults=fault_profile(fault_args))
+    conn.send(server.base_url)
+    server.serve_forever()
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def latency_stats(seconds):
+    ordered = sorted(seconds)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2) if ordered else None,
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def write_config(args, codes):
+    config = {
+        "funds": [{"code": code, "name": f"合成基金{code}"} for code in codes],
+        "sources": ["jisilu", "eastmoney_page"],
+        "fetch_workers": args.workers,
+        "host_rate_limit": args.rate_limit,
+        "connect_timeout": args.connect_timeout,
+        "read_timeout": args.read_timeout,
+        "max_retries": args.retries,
+        "run_deadline_seconds": args.deadline,
+        "breaker_failure_threshold": args.breaker_threshold,
+        "run_summary_file": "",
+    }
+    with open('config.json', 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+
+
+def run_load(args):
+    from classify import exchange_traded
+    from devtools.replay_server import redirect_client
+    from devtools.synthetic import make_codes
+    from monitor import FundMonitor
+
+    codes = make_codes(args.funds, args.etf_share, args.seed)
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(
+        target=_serve, args=(child_conn, [c for c in codes if exchange_traded(c)], args), daemon=True)
+    server.start()
+    base_url = parent_conn.recv()
+
+    rss_before = peak_rss_mb()
+    write_config(args, codes)
+    monitor = FundMonitor(use_cache=False)
+    monitor.notifier.channels = {}  # never send anything from a load test
+    redirect_client(monitor.http, base_url, pool_size=max(monitor.fetch_workers, 2))
+
+    records = []
+    fetch = monitor.fetch
+
+    def fetch_and_keep():
+        records.extend(fetch())
+        return records
+
+    monitor.fetch = fetch_and_keep
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO() if not args.verbose else sys.stdout):
+            monitor.run()
+    finally:
+        elapsed = time.perf_counter() - start
+        with urllib.request.urlopen(f"{base_url}/__stats", timeout=5) as resp:
+            server_stats = json.load(resp)
+        server.terminate()
+
+    summary = monitor.telemetry.summary()
+    spans = list(monitor.telemetry.spans)
+    fund_seconds = [s["seconds"] for s in spans if s["name"] == "fetch.fund"]
+    jisilu_seconds = [s["seconds"] for s in spans if s["name"] == "fetch.jisilu"]
+    fetch_seconds = summary["stages"].get("fetch", {}).get("seconds") or elapsed
+
+    resolved = {}
+    for record in records:
+        key = record.source or "unresolved"
+        resolved[key] = resolved.get(key, 0) + 1
+
+    return {
+        "funds": len(codes),
+        "exchange_traded": sum(map(exchange_traded, codes)),
+        "run_seconds": round(elapsed, 3),
+        "fetch_seconds": round(fetch_seconds, 3),
+        "throughput_funds_per_s": round(len(codes) / fetch_seconds, 1) if fetch_seconds else None,
+        "requests_per_s": round(summary["totals"]["requests"] / fetch_seconds, 1) if fetch_seconds else None,
+        "fund_fetch": latency_stats(fund_seconds),
+        "jisilu_fetch": latency_stats(jisilu_seconds),
+        "totals": summary["totals"],
+        "resolved_by": resolved,
+        "sources": monitor.pipeline.stats,
+        "server": server_stats,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    from devtools.replay_server import add_fault_arguments
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--funds', type=int, default=500)
+    arg_parser.add_argument('--etf-share', type=float, default=0.3, help="share of funds served by the Jisilu list")
+    arg_parser.add_argument('--workers', type=int, default=8, help="fetch_workers")
+    arg_parser.add_argument('--rate-limit', type=float, default=0, help="host_rate_limit in requests/s (0: unpaced)")
+    arg_parser.add_argument('--connect-timeout', type=float, default=5)
+    arg_parser.add_argument('--read-timeout', type=float, default=30)
+    arg_parser.add_argument('--retries', type=int, default=3, help="max_retries (attempts per request)")
+    arg_parser.add_argument('--deadline', type=float, default=300, help="run_deadline_seconds (0: none)")
+    arg_parser.add_argument('--breaker-threshold', type=int, default=5, help="breaker_failure_threshold")
+    arg_parser.add_argument('--output', metavar='FILE', help="write the results to this JSON file")
+    arg_parser.add_argument('--verbose', action='store_true', help="show the monitor's output")
+    add_fault_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory(prefix='loadgen-') as scratch:
+        os.chdir(scratch)
+        try:
+            results = run_load(args)
+        finally:
+            os.chdir(ROOT)
+    results["params"] = {k: v for k, v in vars(args).items() if k not in ('output', 'verbose')}
+
+    fund, jsl = results["fund_fetch"], results["jisilu_fetch"]
+    print(f"{results['funds']} funds ({results['exchange_traded']} exchange-traded) in {results['run_seconds']:.2f}s, "
+          f"fetch stage {results['fetch_seconds']:.2f}s")
+    print(f"  per-fund fetch  p50 {fund['p50_ms']} ms  p99 {fund['p99_ms']} ms  max {fund['max_ms']} ms  (n={fund['count']})")
+    print(f"  jisilu fetch    p50 {jsl['p50_ms']} ms  p99 {jsl['p99_ms']} ms  (n={jsl['count']})")
+    print(f"  throughput      {results['throughput_funds_per_s']} funds/s, {results['requests_per_s']} requests/s, "
+          f"{results['totals']['retries']} retr(ies)")
+    print(f"  resolved by     {results['resolved_by']}")
+    print(f"  server          {results['server']}")
+    print(f"  peak RSS        {results['peak_rss_mb']} MB (before run {results['rss_before_mb']} MB)")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Local stand-in for Jisilu and EastMoney that replays recorded fixtures.
+
+The Jisilu QDII list is served from fixtures/jisilu_qdii_E.json, with its
+rows repeated under the requested fund codes. Every jbgk page is one of the
+recorded fixtures/jbgk_*.html pages, chosen by code. A FaultProfile adds
+response latency, HTTP 500s, 429s with Retry-After and slowloris bodies.
+GET /__stats returns the server's request counters as JSON.
+
+Usage: python -m devtools.replay_server [--funds N] [--port 8000] [--latency SPEC]
+                                        [--error-rate P] [--throttle-rate P] [--slowloris-rate P]
+"""
+import argparse
+import glob
+import http.server
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_jisilu_fixture():
+    with open(os.path.join(FIXTURE_DIR, 'jisilu_qdii_E.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_jbgk_fixtures():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'jbgk_*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def make_jisilu_payload(codes):
+    """Jisilu list response with one recorded row per code."""
+    fixture = load_jisilu_fixture()
+    template_rows = fixture['rows']
+    rows = []
+    for i, code in enumerate(codes):
+        cell = dict(template_rows[i % len(template_rows)]['cell'], fund_id=code)
+        rows.append({"id": code, "cell": cell})
+    return json.dumps(dict(fixture, rows=rows, total=len(rows)), ensure_ascii=False).encode('utf-8')
+
+
+def parse_latency(spec):
+    """Latency distribution from a spec string, as a function of a Random returning seconds.
+
+    "0.05" fixed, "uniform:LO,HI", "normal:MEAN,SD", "lognormal:MEDIAN,SIGMA"
+    or "exp:MEAN". Negative draws are clamped to 0.
+    """
+    if not spec:
+        return lambda rng: 0.0
+    kind, _, params = spec.partition(':')
+    if not params:
+        value = float(kind)
+        return lambda rng: value
+    args = [float(p) for p in params.split(',')]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(*args)
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(*args))
+    if kind == 'lognormal':
+        median, sigma = args
+        return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    if kind == 'exp':
+        return lambda rng: rng.expovariate(1.0 / args[0])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class FaultProfile:
+    """Latency and failure injection for ReplayServer responses.
+
+    Each response waits a draw from latency, then fails with HTTP 500 with
+    probability error_rate, is refused with 429 and Retry-After: retry_after
+    with probability throttle_rate, or has its body dribbled out over
+    slowloris_seconds (a chunk every half second, so per-read timeouts never
+    fire) with probability slowloris_rate.
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 slowloris_rate=0.0, slowloris_seconds=20.0, seed=0):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.slowloris_rate = slowloris_rate
+        self.slowloris_seconds = slowloris_seconds
+        self.rng = random.Random(seed)
+
+    def draw(self):
+        """Return (delay seconds, fault) with fault one of None, "error", "throttle", "slowloris"."""
+        roll = self.rng.random()
+        fault = None
+        for name, rate in (("error", self.error_rate), ("throttle", self.throttle_rate),
+                           ("slowloris", self.slowloris_rate)):
+            if roll < rate:
+                fault = name
+                break
+            roll -= rate
+        return self.latency(self.rng), fault
+
+
+class _ReplayHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _send_empty(self, code, headers=None):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _dribble(self, body, seconds):
+        steps = max(1, int(seconds * 2))
+        chunk = max(1, -(-len(body) // steps))
+        try:
+            for i in range(0, len(body), chunk):
+                self.wfile.write(body[i:i + chunk])
+                self.wfile.flush()
+                time.sleep(0.5)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up
+
+    def do_GET(self):
+        server = self.server
+        path = urlsplit(self.path).path
+        if path == '/__stats':
+            body = json.dumps(server.stats).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path.startswith('/data/qdii/qdii_list'):
+            body, content_type = server.jisilu_payload, 'application/json; charset=utf-8'
+        elif path.startswith('/f10/jbgk_'):
+            code = path[len('/f10/jbgk_'):].split('.')[0]
+            body, content_type = server.jbgk_pages[sum(map(ord, code)) % len(server.jbgk_pages)], 'text/html; charset=utf-8'
+        else:
+            self._send_empty(404)
+            return
+
+        delay, fault = server.faults.draw() if server.faults else (0.0, None)
+        server.count("requests", fault or "ok")
+        if delay:
+            time.sleep(delay)
+        if fault == "error":
+            self._send_empty(500)
+            return
+        if fault == "throttle":
+            self._send_empty(429, {'Retry-After': str(server.faults.retry_after)})
+            return
+        server.hits += 1
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if fault == "slowloris":
+            self._dribble(body, server.faults.slowloris_seconds)
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    """Serve recorded fixtures for codes on host:port (port 0 picks a free one).
+
+    The Jisilu list holds a row for every code; jbgk pages are served for
+    any code. faults is an optional FaultProfile.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, codes, host='127.0.0.1', port=0, faults=None):
+        super().__init__((host, port), _ReplayHandler)
+        self.jisilu_payload = make_jisilu_payload(codes)
+        self.jbgk_pages = load_jbgk_fixtures()
+        self.faults = faults
+        self.hits = 0
+        self.stats = {"requests": 0, "ok": 0, "error": 0, "throttle": 0, "slowloris": 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, *keys):
+        with self._stats_lock:
+            for key in keys:
+                self.stats[key] += 1
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to base_url, keeping path and query."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base = urlsplit(base_url)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((self.base.scheme, self.base.netloc, parts.path, parts.query, ''))
+        return super().send(request, **kwargs)
+
+
+def redirect_client(http_client, base_url, pool_size=10):
+    """Point an HttpClient's session at base_url for both http and https URLs."""
+    adapter = RedirectAdapter(base_url, pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    http_client.session.mount("http://", adapter)
+    http_client.session.mount("https://", adapter)
+
+
+def add_fault_arguments(parser):
+    parser.add_argument('--latency', metavar='SPEC',
+                        help="response latency: SECONDS, uniform:LO,HI, normal:MEAN,SD, lognormal:MEDIAN,SIGMA or exp:MEAN")
+    parser.add_argument('--error-rate', type=float, default=0.0, metavar='P', help="share of HTTP 500 responses")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, metavar='P', help="share of HTTP 429 responses")
+    parser.add_argument('--retry-after', type=int, default=1, metavar='SECONDS', help="Retry-After sent with 429s")
+    parser.add_argument('--slowloris-rate', type=float, default=0.0, metavar='P',
+                        help="share of responses whose body is dribbled out slowly")
+    parser.add_argument('--slowloris-seconds', type=float, default=20.0, metavar='SECONDS')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def fault_profile(args):
+    return FaultProfile(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        slowloris_rate=args.slowloris_rate,
+        slowloris_seconds=args.slowloris_seconds,
+        seed=args.seed,
+    )
+
+
+def main():
+    from classify import exchange_traded
+    from devtools.synthetic import make_codes
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--funds', type=int, default=500, help="number of synthetic fund codes")
+    arg_parser.add_argument('--etf-share', type=float, default=0.3, help="share of exchange-traded codes")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8000)
+    add_fault_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    codes = make_codes(args.funds, args.etf_share, args.seed)
+    server = ReplayServer([c for c in codes if exchange_traded(c)], args.host, args.port,
+                          faults=fault_profile(args))
+    print(f"Serving {len(codes)} funds on {server.base_url} (stats: {server.base_url}/__stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
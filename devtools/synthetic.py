@@ -0,0 +1,87 @@
+"""Synthetic fund lists and scratch state for offline benchmarks."""
+import contextlib
+import os
+import random
+import shutil
+import tempfile
+
+from records import FundRecord
+
+NAMES = [
+    "广发纳斯达克100ETF联接人民币(QDII)A",
+    "易方达标普500指数人民币A",
+    "博时标普500ETF联接C",
+    "大成纳斯达克100ETF联接(QDII)A",
+    "华宝纳斯达克精选股票发起式(QDII)A",
+    "纳指ETF",
+    "标普500ETF",
+    "华夏恒生科技ETF联接(QDII)A",
+]
+
+
+def make_funds(n, seed=0):
+    """Return n FundRecords with a realistic mix of statuses and limits."""
+    rng = random.Random(seed)
+    funds = []
+    for i in range(n):
+        status = rng.choice(["开放申购", "暂停申购", "限大额", "限大额", "限1000"])
+        if status == "开放申购":
+            limit_val, limit_text = float('inf'), "None"
+        elif status == "暂停申购":
+            limit_val, limit_text = -1, "None"
+        else:
+            limit_val = rng.choice([0, 10, 100, 1000, 10000])
+            limit_text = f"{limit_val}元"
+        funds.append(FundRecord(
+            f"{i:06d}",
+            rng.choice(NAMES),
+            status=status,
+            limit_text=limit_text,
+            limit_val=limit_val,
+            premium_rate=rng.choice([None, None, round(rng.uniform(-2, 8), 2)]),
+        ))
+    return funds
+
+
+def make_codes(n, etf_share=0.3, seed=0):
+    """Return n distinct fund codes (n < 150000), about etf_share of them exchange-traded (51xxxx/15xxxx)."""
+    rng = random.Random(seed)
+    codes = []
+    etfs = 0
+    for i in range(n):
+        if rng.random() < etf_share and etfs < 20000:
+            # 510000-519999 first, then 150000-159999
+            codes.append(f"{51 if etfs < 10000 else 15}{etfs % 10000:04d}")
+            etfs += 1
+        else:
+            codes.append(f"{i:06d}")
+    return codes
+
+
+def make_history(funds, seed=0):
+    """Return a history snapshot with plausible previous limits for funds."""
+    rng = random.Random(seed + 1)
+    limits = {}
+    for f in funds:
+        if rng.random() < 0.8:
+            limits[f['code']] = rng.choice([f['limit_val'], float('inf'), -1, 0, 100, 1000])
+    return {"date": "2026-01-01", "limits": limits}
+
+
+@contextlib.contextmanager
+def scratch_workdir(prefix='bench-', copy=('config.json', 'fund_index.json')):
+    """Run the block in a temporary working directory holding copies of copy.
+
+    FundMonitor keeps history.db, its caches and the outbox in the working
+    directory, so a benchmark run from the repo would change the real state.
+    """
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=prefix) as scratch:
+        for name in copy:
+            if os.path.exists(os.path.join(root, name)):
+                shutil.copy(os.path.join(root, name), scratch)
+        os.chdir(scratch)
+        try:
+            yield scratch
+        finally:
+            os.chdir(root)
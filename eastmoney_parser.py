@@ -0,0 +1,62 @@
+import html as html_lib
+import re
+
+# Precompiled patterns for the EastMoney jbgk (基本概况) page
+STATUS_ANCHOR = '交易状态'
+STATUS_WINDOW = 800
+STATUS_RE = re.compile(r"交易状态：\s*(\S+)")
+LIMIT_RE = re.compile(r"（(.*单日.*上限.*)）")
+LIMIT_PREFIX_RE = re.compile(r"单日.*?上限")
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _clean_limit(raw_limit):
+    clean_limit = TAG_RE.sub('', raw_limit)
+    return LIMIT_PREFIX_RE.sub('', clean_limit).replace("（", "").replace("）", "")
+
+
+def _extract_limit(page):
+    limit_match = LIMIT_RE.search(page)
+    return _clean_limit(limit_match.group(1)) if limit_match else None
+
+
+def parse_jbgk_fast(page):
+    """Extract trading status and daily limit without building a DOM.
+
+    Only the text right after the first "交易状态" anchor is de-tagged, which
+    matches what soup.get_text() would yield for that region. Returns None
+    when the anchor is missing or the status runs past the window, so the
+    caller can fall back to the full parse.
+    """
+    idx = page.find(STATUS_ANCHOR)
+    if idx < 0:
+        return None
+    window = html_lib.unescape(TAG_RE.sub('', page[idx:idx + STATUS_WINDOW]))
+    status_match = STATUS_RE.search(window)
+    if not status_match or status_match.end() >= len(window):
+        return None
+    return {"status": status_match.group(1), "limit_text": _extract_limit(page)}
+
+
+def parse_jbgk_soup(page):
+    """Extract trading status and daily limit from a full BeautifulSoup parse."""
+    # Imported here: bs4 is only needed when the fast path misses
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, 'html.parser')
+    status = None
+
+    status_match = STATUS_RE.search(soup.get_text())
+    if status_match:
+        status = status_match.group(1)
+    else:
+        th = soup.find(lambda tag: tag.name in ['th', 'td'] and STATUS_ANCHOR in tag.get_text())
+        if th and th.find_next_sibling('td'):
+            status = th.find_next_sibling('td').get_text(strip=True)
+
+    return {"status": status, "limit_text": _extract_limit(page)}
+
+
+def parse_jbgk(page):
+    """Parse a jbgk page, trying the fast extractor before the soup fallback."""
+    return parse_jbgk_fast(page) or parse_jbgk_soup(page)
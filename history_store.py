@@ -0,0 +1,316 @@
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    run_date TEXT NOT NULL,
+    run_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_date ON runs (run_date);
+
+CREATE TABLE IF NOT EXISTS statuses (
+    status_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL UNIQUE
+);
+
+-- One row per fund per run, clustered by (code, run_id) for per-fund range scans.
+-- limit_val NULL means unlimited (Infinity) so the common case costs no bytes.
+CREATE TABLE IF NOT EXISTS observations (
+    code TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    status_id INTEGER NOT NULL,
+    limit_val INTEGER,
+    premium_rate REAL,
+    stale INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (code, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_by_run ON observations (run_id);
+
+-- Months whose unchanged observations have been dropped (see compact()).
+-- members is 1 once compacted_spans records which funds each of its runs included.
+CREATE TABLE IF NOT EXISTS compacted_months (
+    month TEXT PRIMARY KEY,
+    compacted_at TEXT NOT NULL,
+    members INTEGER NOT NULL DEFAULT 0
+);
+
+-- Runs of a compacted month each fund was part of, as ranges of consecutive runs.
+CREATE TABLE IF NOT EXISTS compacted_spans (
+    code TEXT NOT NULL,
+    first_run INTEGER NOT NULL,
+    last_run INTEGER NOT NULL,
+    PRIMARY KEY (code, first_run)
+) WITHOUT ROWID;
+"""
+
+
+def _encode_limit(val):
+    if val == float('inf'):
+        return None
+    return int(val)
+
+
+def _decode_limit(val):
+    return float('inf') if val is None else val
+
+
+class HistoryStore:
+    """Append-only SQLite store of every run's status, limit and premium rate.
+
+    Appending a run inserts one row per fund, so its cost doesn't depend on
+    how much history exists. Statuses are dictionary-encoded and unlimited
+    quotas are stored as NULL. Months older than a cutoff can be compacted
+    down to change points; reads forward-fill across the dropped rows.
+    """
+
+    def __init__(self, path='history.db'):
+        self.path = path
+        # Watch mode reads it from its poll threads, which never overlap
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self._status_ids = dict(self.conn.execute("SELECT status, status_id FROM statuses"))
+        self._status_names = {v: k for k, v in self._status_ids.items()}
+
+    def _migrate(self):
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(observations)")}
+        if 'stale' not in columns:
+            # Stores created before incremental runs: reused (stale) values were never recorded
+            self.conn.execute("ALTER TABLE observations ADD COLUMN stale INTEGER NOT NULL DEFAULT 0")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(compacted_months)")}
+        if 'members' not in columns:
+            # Months compacted before spans were kept: which funds each run held is lost
+            self.conn.execute("ALTER TABLE compacted_months ADD COLUMN members INTEGER NOT NULL DEFAULT 0")
+
+    def close(self):
+        self.conn.close()
+
+    def _status_id(self, status):
+        status_id = self._status_ids.get(status)
+        if status_id is None:
+            cur = self.conn.execute("INSERT INTO statuses (status) VALUES (?)", (status,))
+            status_id = cur.lastrowid
+            self._status_ids[status] = status_id
+            self._status_names[status_id] = status
+        return status_id
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM runs LIMIT 1").fetchone() is None
+
+    def append_run(self, funds_data, run_date=None):
+        """Record one run's observations, returning the new run_id."""
+        run_date = run_date or time.strftime('%Y-%m-%d')
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (run_date, run_at) VALUES (?, ?)",
+                (run_date, time.strftime('%Y-%m-%d %H:%M:%S')),
+            )
+            run_id = cur.lastrowid
+            rows = {}
+            for f in funds_data:
+                rows[f['code']] = (
+                    f['code'], run_id, self._status_id(f.get('status') or ''),
+                    _encode_limit(f['limit_val']), f.get('premium_rate'), 1 if f.get('stale') else 0,
+                )
+            self.conn.executemany(
+                "INSERT INTO observations (code, run_id, status_id, limit_val, premium_rate, stale) VALUES (?, ?, ?, ?, ?, ?)",
+                rows.values(),
+            )
+        return run_id
+
+    def import_snapshot(self, snapshot):
+        """Seed the store from a legacy history.json {"date", "limits"} snapshot."""
+        limits = snapshot.get('limits') or {}
+        if not limits:
+            return None
+        funds = [{"code": code, "status": "", "limit_val": val} for code, val in limits.items()]
+        return self.append_run(funds, snapshot.get('date'))
+
+    def recent_runs(self, n=1):
+        """Return the last n runs as [(run_id, run_date)], newest first."""
+        return self.conn.execute("SELECT run_id, run_date FROM runs ORDER BY run_id DESC LIMIT ?", (n,)).fetchall()
+
+    def latest_snapshot(self):
+        """Return the most recent run as {"date", "limits"} (history.json's shape)."""
+        row = self.conn.execute("SELECT run_id, run_date FROM runs ORDER BY run_id DESC LIMIT 1").fetchone()
+        if row is None:
+            return {}
+        run_id, run_date = row
+        return {"date": run_date, "limits": {code: obs['limit_val'] for code, obs in self.snapshot(run_id).items()}}
+
+    def snapshot(self, run_id):
+        """Return {code: observation} as of run_id, forward-filling compacted rows.
+
+        Observations also carry stale and, for stale rows, as_of: the date
+        of the fund's last fetched (non-stale) run before it.
+        """
+        month = self.conn.execute("SELECT substr(run_date, 1, 7) FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if month is None:
+            return {}
+        month = month[0]
+        as_of = """CASE WHEN o.stale THEN (
+                       SELECT r2.run_date FROM observations o2 JOIN runs r2 ON r2.run_id = o2.run_id
+                       WHERE o2.code = o.code AND o2.run_id < o.run_id AND o2.stale = 0
+                       ORDER BY o2.run_id DESC LIMIT 1) END"""
+        compacted = self.conn.execute("SELECT members FROM compacted_months WHERE month = ?", (month,)).fetchone()
+        if compacted:
+            # Latest observation per code within the month, at or before run_id,
+            # for the codes that were part of run_id
+            members = """AND EXISTS (SELECT 1 FROM compacted_spans s WHERE s.code = o.code
+                                    AND s.first_run <= :run_id AND s.last_run >= :run_id)"""
+            rows = self.conn.execute(
+                f"""SELECT o.code, o.status_id, o.limit_val, o.premium_rate, o.stale, {as_of}
+                   FROM observations o JOIN runs r ON r.run_id = o.run_id
+                   WHERE substr(r.run_date, 1, 7) = :month AND o.run_id <= :run_id
+                   {members if compacted[0] else ''}
+                   ORDER BY o.run_id""",
+                {"month": month, "run_id": run_id},
+            )
+        else:
+            rows = self.conn.execute(
+                f"SELECT o.code, o.status_id, o.limit_val, o.premium_rate, o.stale, {as_of} "
+                "FROM observations o WHERE o.run_id = ?",
+                (run_id,),
+            )
+        result = {}
+        for code, status_id, limit_val, premium_rate, stale, stale_as_of in rows:
+            obs = self._observation(status_id, limit_val, premium_rate)
+            obs['stale'] = bool(stale)
+            obs['as_of'] = stale_as_of
+            result[code] = obs
+        return result
+
+    def _observation(self, status_id, limit_val, premium_rate):
+        return {
+            "status": self._status_names.get(status_id, ''),
+            "limit_val": _decode_limit(limit_val),
+            "premium_rate": premium_rate,
+        }
+
+    def series(self, code, start=None, end=None):
+        """Return [(run_date, observation)] for code over [start, end] (dates inclusive).
+
+        Uses the (code, run_id) primary key, so cost scales with the range
+        for that fund, not with the total history size.
+        """
+        runs = self.conn.execute(
+            "SELECT run_id, run_date FROM runs WHERE run_date >= ? AND run_date <= ? ORDER BY run_id",
+            (start or '0000-00-00', end or '9999-99-99'),
+        ).fetchall()
+        if not runs:
+            return []
+        compacted = dict(self.conn.execute("SELECT month, members FROM compacted_months"))
+        spans = self.conn.execute("SELECT first_run, last_run FROM compacted_spans WHERE code = ?", (code,)).fetchall()
+        first_run, last_run = runs[0][0], runs[-1][0]
+
+        # Include the last stored row before the range so compacted months can forward-fill
+        obs = self.conn.execute(
+            """SELECT o.run_id, substr(r.run_date, 1, 7), o.status_id, o.limit_val, o.premium_rate
+               FROM observations o JOIN runs r ON r.run_id = o.run_id
+               WHERE o.code = ? AND o.run_id <= ? AND o.run_id >= COALESCE(
+                   (SELECT MAX(run_id) FROM observations WHERE code = ? AND run_id < ?), ?)
+               ORDER BY o.run_id""",
+            (code, last_run, code, first_run, first_run),
+        ).fetchall()
+
+        result = []
+        i = 0
+        last = None
+        for run_id, run_date in runs:
+            while i < len(obs) and obs[i][0] <= run_id:
+                last = obs[i]
+                i += 1
+            if last is None:
+                continue
+            month = run_date[:7]
+            if last[0] == run_id or (month in compacted and last[1] == month and (
+                    not compacted[month] or any(first <= run_id <= end for first, end in spans))):
+                result.append((run_date, self._observation(*last[2:])))
+        return result
+
+    def recent_observations(self, since):
+        """Yield (code, run_date, observation, stale) for runs on or after since, by code then run."""
+        rows = self.conn.execute(
+            """SELECT o.code, r.run_date, o.status_id, o.limit_val, o.premium_rate, o.stale
+               FROM observations o JOIN runs r ON r.run_id = o.run_id
+               WHERE r.run_date >= ?
+               ORDER BY o.code, o.run_id""",
+            (since,),
+        )
+        for code, run_date, status_id, limit_val, premium_rate, stale in rows:
+            yield code, run_date, self._observation(status_id, limit_val, premium_rate), bool(stale)
+
+    def last_known_good(self, codes, since=None):
+        """Return {code: (run_date, observation)} with each code's latest fetched value.
+
+        Rows reused from history (stale) and rows without a known status are
+        skipped, as are runs before since. One primary-key range scan per code.
+        """
+        unknown = [status_id for status, status_id in self._status_ids.items() if status in ('', 'Unknown')]
+        query = f"""SELECT r.run_date, o.status_id, o.limit_val, o.premium_rate
+                    FROM observations o JOIN runs r ON r.run_id = o.run_id
+                    WHERE o.code = ? AND o.stale = 0 AND r.run_date >= ?
+                      AND o.status_id NOT IN ({','.join('?' * len(unknown))})
+                    ORDER BY o.run_id DESC LIMIT 1"""
+        result = {}
+        for code in codes:
+            row = self.conn.execute(query, (code, since or '0000-00-00', *unknown)).fetchone()
+            if row is not None:
+                result[code] = (row[0], self._observation(*row[1:]))
+        return result
+
+    def compact(self, keep_days=90):
+        """Drop unchanged observations in whole months older than keep_days.
+
+        Within each compacted month only the first row per fund and rows
+        where status, limit or premium changed are kept. The runs each fund
+        was part of are kept in compacted_spans, so reads don't forward-fill
+        funds past the run they dropped out of the list.
+        """
+        cutoff = time.strftime('%Y-%m', time.localtime(time.time() - keep_days * 86400))
+        months = [row[0] for row in self.conn.execute(
+            """SELECT DISTINCT substr(run_date, 1, 7) AS month FROM runs
+               WHERE month < ? AND month NOT IN (SELECT month FROM compacted_months)""",
+            (cutoff,),
+        )]
+        for month in months:
+            with self.conn:
+                # Gaps and islands: a fund's consecutive runs share run_seq - its row number
+                self.conn.execute(
+                    """INSERT INTO compacted_spans (code, first_run, last_run)
+                       SELECT code, MIN(run_id), MAX(run_id) FROM (
+                           SELECT o.code, o.run_id,
+                                  r.run_seq - ROW_NUMBER() OVER (PARTITION BY o.code ORDER BY o.run_id) AS island
+                           FROM observations o JOIN (
+                               SELECT run_id, ROW_NUMBER() OVER (ORDER BY run_id) AS run_seq
+                               FROM runs WHERE substr(run_date, 1, 7) = ?
+                           ) r ON r.run_id = o.run_id
+                       )
+                       GROUP BY code, island""",
+                    (month,),
+                )
+                self.conn.execute(
+                    """DELETE FROM observations WHERE (code, run_id) IN (
+                           SELECT code, run_id FROM (
+                               SELECT o.code, o.run_id, o.status_id, o.limit_val, o.premium_rate,
+                                      LAG(o.status_id) OVER w AS p_status,
+                                      LAG(o.limit_val) OVER w AS p_limit,
+                                      LAG(o.premium_rate) OVER w AS p_premium,
+                                      ROW_NUMBER() OVER w AS rn
+                               FROM observations o JOIN runs r ON r.run_id = o.run_id
+                               WHERE substr(r.run_date, 1, 7) = ?
+                               WINDOW w AS (PARTITION BY o.code ORDER BY o.run_id)
+                           )
+                           WHERE rn > 1 AND status_id = p_status
+                             AND limit_val IS p_limit AND premium_rate IS p_premium
+                       )""",
+                    (month,),
+                )
+                self.conn.execute(
+                    "INSERT INTO compacted_months (month, compacted_at, members) VALUES (?, ?, 1)",
+                    (month, time.strftime('%Y-%m-%d %H:%M:%S')),
+                )
+        if months:
+            print(f"History: compacted {len(months)} month(s): {', '.join(months)}")
+        return months
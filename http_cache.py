@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+
+class ResponseCache:
+    """Persistent on-disk HTTP response cache keyed by URL.
+
+    Each entry stores the body plus its ETag/Last-Modified validators. Entries
+    younger than ttl are served directly; older ones are revalidated with a
+    conditional GET. Total body size is bounded by max_bytes, evicting the
+    least recently used entries first.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir='.http_cache', ttl=7200, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.index = self._load_index()
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, url):
+        """Return (entry, fresh) for url, or (None, False) on a miss."""
+        key = self._key(url)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or not os.path.exists(self._body_path(key)):
+                return None, False
+            entry['accessed'] = time.time()
+            fresh = time.time() - entry['stored_at'] < self.ttl
+            return entry, fresh
+
+    def conditional_headers(self, entry):
+        """Build If-None-Match / If-Modified-Since headers for revalidation."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def build_response(self, url, entry):
+        """Rebuild a requests.Response from a cached entry."""
+        import requests
+
+        with open(self._body_path(self._key(url)), 'rb') as f:
+            body = f.read()
+        resp = requests.Response()
+        resp.status_code = entry['status']
+        resp._content = body
+        resp.url = url
+        resp.encoding = entry.get('encoding')
+        resp.headers.update(entry.get('headers', {}))
+        resp.from_cache = True
+        return resp
+
+    def touch(self, url):
+        """Mark an entry as freshly revalidated after a 304."""
+        with self.lock:
+            entry = self.index.get(self._key(url))
+            if entry:
+                entry['stored_at'] = time.time()
+
+    def store(self, url, resp):
+        """Store a successful response body and its validators."""
+        if resp.status_code != 200:
+            return
+        key = self._key(url)
+        body = resp.content
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self.lock:
+            with open(self._body_path(key), 'wb') as f:
+                f.write(body)
+            now = time.time()
+            self.index[key] = {
+                'url': url,
+                'status': resp.status_code,
+                'encoding': resp.encoding,
+                'headers': {k: v for k, v in resp.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')},
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified'),
+                'size': len(body),
+                'stored_at': now,
+                'accessed': now,
+            }
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = sum(e['size'] for e in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]['accessed']):
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            del self.index[key]
+            total -= entry['size']
+            if total <= self.max_bytes:
+                break
+
+    def save(self):
+        """Persist the index; bodies are written as they are stored."""
+        if not self.index and not os.path.isdir(self.cache_dir):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self.lock:
+            tmp_path = self._index_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self._index_path())
+
+    def purge(self):
+        """Delete every cached entry."""
+        with self.lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.index = {}
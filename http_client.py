@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to cap the request rate to one host."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    """Pooled HTTP client shared by every request in a monitor run.
+
+    Connections are kept alive per host through a single requests.Session.
+    Connection errors, timeouts, 429 and 5xx responses are retried with
+    full-jitter exponential backoff, honouring Retry-After when the server
+    sends one. Requests to each host are paced by a token bucket. GETs made
+    with use_cache=True go through the optional on-disk ResponseCache.
+    Requests, retries, bytes and cache hits are reported to the optional
+    RunTelemetry. requests itself is imported when the first request is
+    made, so runs that never touch the network start faster.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    # time.monotonic() value past which failed requests are not retried (set per run)
+    deadline = None
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30,
+                 max_retries=3, backoff_base=1.0, backoff_cap=30.0, rate_limit=2,
+                 cache=None, telemetry=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max(1, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.rate_limit = rate_limit
+        self.cache = cache
+        self.telemetry = telemetry
+
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        self._rate_limiters = {}
+        self._rate_limiters_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _throttle(self, url):
+        """Wait for the per-host token bucket before issuing a request to url."""
+        host = urlparse(url).netloc
+        with self._rate_limiters_lock:
+            bucket = self._rate_limiters.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_limit)
+                self._rate_limiters[host] = bucket
+        bucket.acquire()
+
+    def _count(self, **counters):
+        if self.telemetry is not None:
+            self.telemetry.add(**counters)
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff so concurrent retries don't line up."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** (attempt - 1))))
+
+    def _retry_after(self, resp):
+        """Parse a Retry-After header (seconds or HTTP date), capped at backoff_cap."""
+        value = resp.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            from email.utils import parsedate_to_datetime
+
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_cap, max(0.0, delay))
+
+    def _past_deadline(self, delay):
+        """True if retrying after delay seconds would run past the deadline."""
+        return self.deadline is not None and time.monotonic() + delay >= self.deadline
+
+    def request(self, method, url, timeout=None, retry=True, **kwargs):
+        """Send a request with pooling, pacing and retries.
+
+        timeout may be a single read timeout or a (connect, read) tuple.
+        Returns the final response (which may still carry an error status
+        after the last attempt); raises the last transport error otherwise.
+        No retry is scheduled past the deadline. retry=False sends a single
+        attempt, for non-idempotent requests whose caller handles retries.
+        """
+        import requests
+
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        elif not isinstance(timeout, tuple):
+            timeout = (self.connect_timeout, timeout)
+
+        max_attempts = self.max_retries if retry else 1
+        for attempt in range(1, max_attempts + 1):
+            self._throttle(url)
+            try:
+                resp = self.session.request(method, url, timeout=timeout, **kwargs)
+                self._count(requests=1, bytes=len(resp.content))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._count(requests=1)
+                delay = self._backoff(attempt)
+                if attempt == max_attempts or self._past_deadline(delay):
+                    raise
+                reason = e
+            else:
+                if resp.status_code not in self.RETRY_STATUSES or attempt == max_attempts:
+                    return resp
+                delay = self._retry_after(resp)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                if self._past_deadline(delay):
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+                resp.close()
+
+            self._count(retries=1)
+            print(f"HTTP retry {attempt}/{max_attempts - 1} for {url} in {delay:.1f}s: {reason}")
+            time.sleep(delay)
+
+    def get(self, url, use_cache=False, **kwargs):
+        if not (use_cache and self.cache):
+            return self.request("GET", url, **kwargs)
+
+        entry, fresh = self.cache.lookup(url)
+        if entry and fresh:
+            self._count(cache_hits=1)
+            return self.cache.build_response(url, entry)
+        if entry:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers.update(self.cache.conditional_headers(entry))
+            kwargs["headers"] = headers
+
+        resp = self.request("GET", url, **kwargs)
+        if entry and resp.status_code == 304:
+            self._count(cache_hits=1)
+            self.cache.touch(url)
+            return self.cache.build_response(url, entry)
+        self.cache.store(url, resp)
+        return resp
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        if self.cache:
+            self.cache.save()
+        if self._session is not None:
+            self._session.close()
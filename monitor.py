@@ -1,22 +1,44 @@
-import requests
-from bs4 import BeautifulSoup
+import io
 import json
 import time
 import re
 import os
 import random
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import markdown
+from concurrent.futures import ThreadPoolExecutor
+
+from classify import Classifier
+from eastmoney_parser import parse_jbgk
+from http_cache import ResponseCache
+from history_store import HistoryStore
+from http_client import HttpClient
+from notifier import NotificationDispatcher, NotificationQueue, SmtpChannel, WebhookChannel
+from records import FundRecord, format_amount, limit_text_of
+from report import build_report_model, render_html, render_markdown
+from scheduler import IncrementalScheduler
+from sources import NOT_FOUND, EastMoneyBulkSource, JisiluSource, SourcePipeline
+from subscriptions import load_subscriptions, render_digests
+from telemetry import RunTelemetry
+
 
 class FundMonitor:
     CONFIG_FILE = 'config.json'
-    HISTORY_FILE = 'history.json'
+    HISTORY_FILE = 'history.json'  # Legacy single-snapshot history, imported once
+    HISTORY_DB = 'history.db'
+    FUND_INDEX_FILE = 'fund_index.json'
     
-    def __init__(self):
+    def __init__(self, use_cache=True, incremental=False, shards=None, shard=None):
         self.config = self._load_json(self.CONFIG_FILE)
-        self.history = self._load_json(self.HISTORY_FILE)
+        self.use_cache = use_cache
+
+        # Per-stage timing spans and HTTP counters, summarized to JSON after each run
+        self.telemetry = RunTelemetry()
+        self.summary_file = self.config.get('run_summary_file', 'run_summary.json')
+
+        # Time-series history store; self.history is the latest run's snapshot
+        self.history_store = HistoryStore(self.config.get('history_db', self.HISTORY_DB))
+        if self.history_store.is_empty() and os.path.exists(self.HISTORY_FILE):
+            self.history_store.import_snapshot(self._load_json(self.HISTORY_FILE))
+        self.history = self.history_store.latest_snapshot()
         
         # WeChat Webhook (Backward compatibility)
         self.webhook_url = os.environ.get('WEBHOOK_URL') or self.config.get('webhook_url')
@@ -28,8 +50,73 @@ class FundMonitor:
         self.smtp_server = os.environ.get('SMTP_SERVER')
         self.smtp_port = os.environ.get('SMTP_PORT')
         self.email_receiver = os.environ.get('EMAIL_RECEIVER') # Supports comma-separated list
+        self.smtp_starttls = os.environ.get('SMTP_STARTTLS', '1') != '0'
+
+        # Per-recipient digests; SUBSCRIPTIONS (JSON) keeps addresses out of the repo
+        self.subscriptions = load_subscriptions(os.environ.get('SUBSCRIPTIONS') or self.config.get('subscriptions'))
         
         self.funds_config = self.config.get('funds', [])
+
+        # Name classification rules (config "classification"), memoized per code between runs
+        # and seeded from the index precomputed by update_funds.py
+        self.classifier = Classifier(
+            self.config.get('classification'),
+            cache_path=self.config.get('classify_cache_file', '.classify_cache.json'),
+            max_entries=int(self.config.get('classify_cache_size', 5000)),
+        )
+        self.classifier.seed(self._load_json(self.config.get('fund_index_file', self.FUND_INDEX_FILE)))
+
+        # Fetch concurrency: worker threads and max requests per second per host
+        self.fetch_workers = int(os.environ.get('FETCH_WORKERS') or self.config.get('fetch_workers', 8))
+        self.host_rate_limit = float(os.environ.get('HOST_RATE_LIMIT') or self.config.get('host_rate_limit', 2))
+
+        # Sharded runs: per-fund fetches spread over worker processes. shard=(index, count)
+        # marks a worker, which gets its own cache directory and a share of the rate limit.
+        self.shards = max(1, int(shards or self.config.get('shards', 1)))
+        cache_dir = self.config.get('http_cache_dir', '.http_cache')
+        if shard is not None:
+            index, count = shard
+            cache_dir = os.path.join(cache_dir, f"shard-{index}")
+            self.host_rate_limit /= count
+
+        # On-disk cache for rarely-changing fund pages (revalidated via ETag/Last-Modified)
+        self.http_cache = ResponseCache(
+            cache_dir=cache_dir,
+            ttl=float(self.config.get('http_cache_ttl', 7200)),
+            max_bytes=int(float(self.config.get('http_cache_max_mb', 50)) * 1024 * 1024),
+        )
+
+        # Shared pooled HTTP client (keep-alive, jittered retries, Retry-After)
+        self.http = HttpClient(
+            pool_size=max(self.fetch_workers, 2),
+            connect_timeout=float(self.config.get('connect_timeout', 5)),
+            read_timeout=float(self.config.get('read_timeout', 30)),
+            max_retries=int(self.config.get('max_retries', 3)),
+            rate_limit=self.host_rate_limit,
+            cache=self.http_cache if use_cache else None,
+            telemetry=self.telemetry,
+        )
+
+        # Notification channels share a persistent outbound queue and reuse connections
+        channels = []
+        if self.email_sender and self.email_password and self.smtp_server and (self.email_receiver or self.subscriptions):
+            channels.append(SmtpChannel(
+                self.smtp_server, self.smtp_port, self.email_user, self.email_password,
+                self.email_sender, starttls=self.smtp_starttls,
+            ))
+        if self.webhook_url and "YOUR_WECHAT" not in self.webhook_url:
+            channels.append(WebhookChannel(self.http, self.webhook_url))
+        self.notifier = NotificationDispatcher(
+            channels,
+            NotificationQueue(self.config.get('outbox_dir', '.outbox')),
+            max_attempts=int(self.config.get('notify_max_attempts', 3)),
+        )
+
+        # Data-source pipeline (bulk sources first, per-fund scrapes for the rest)
+        self.pipeline = SourcePipeline(self, self.config.get('sources'))
+
+        # Incremental mode: skip per-fund fetches for long-stable funds, reusing history
+        self.incremental = incremental or bool(self.config.get('incremental'))
         
     def _load_json(self, filename):
         if not os.path.exists(filename):
@@ -41,9 +128,10 @@ class FundMonitor:
             print(f"Error loading {filename}: {e}")
             return {}
 
-    def _save_history(self, data):
-        with open(self.HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def _save_history(self, funds_data):
+        """Append this run to the history store and compact old months."""
+        self.history_store.append_run(funds_data)
+        self.history_store.compact(int(self.config.get('history_compact_days', 90)))
 
     def _parse_amount(self, text):
         """Parse amount text to numeric value."""
@@ -64,20 +152,10 @@ class FundMonitor:
         return int(num)
 
     def _shorten_name(self, name):
-        name = name.replace("纳斯达克100", "纳指100")
-        keywords = ["ETF联接", "指数", "发起式", "发起", "精选", "股票", "(LOF)"]
-        for kw in keywords:
-            name = name.replace(kw, "")
-        if name.endswith("A"):
-            name = name[:-1]
-        return name
+        return self.classifier.shorten_name(name)
 
     def _get_index_type(self, name):
-        if "纳斯达克" in name or "纳指" in name:
-            return "纳斯达克100"
-        if "标普" in name:
-            return "标普500"
-        return "其他"
+        return self.classifier.index_type(name)
 
     def _get_random_ua(self):
         """Return a randomized modern browser User-Agent string."""
@@ -93,13 +171,39 @@ class FundMonitor:
         ]
         return random.choice(ua_list)
 
-    def fetch_jisilu_qdii_data(self):
+    def fetch_jisilu_qdii_data(self, lists=None):
         """Fetch QDII ETF/LOF data in bulk from Jisilu (集思录).
-        
-        Returns a dict keyed by fund_id with parsed fund data.
+
+        Returns a dict keyed by fund_id with parsed fund data; lists that
+        fail to load are left out (see fetch_jisilu_lists).
+        """
+        return self.fetch_jisilu_lists(lists)[0]
+
+    def fetch_jisilu_lists(self, lists=None):
+        """Fetch every Jisilu QDII list variant in lists in parallel.
+
+        lists defaults to config jisilu_lists (E 欧美市场, A 亚洲市场, C 商品).
+        Returns (data, failed): data keyed by fund_id with parsed fund data,
+        failed the variants that could not be fetched.
         Only covers exchange-traded QDII funds (ETFs/LOFs), not OTC share classes.
         """
-        url = "https://www.jisilu.cn/data/qdii/qdii_list/E"
+        lists = lists or self.config.get('jisilu_lists', ["E", "A", "C"])
+        jisilu_data = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=len(lists)) as executor:
+            for variant, variant_data in zip(lists, executor.map(self._fetch_jisilu_list, lists)):
+                if variant_data is None:
+                    failed.append(variant)
+                else:
+                    jisilu_data.update(variant_data)
+        print(f"Jisilu: fetched {len(jisilu_data)} QDII ETF/LOF records from {len(lists) - len(failed)} "
+              f"of {len(lists)} list(s).")
+        return jisilu_data, failed
+
+    def _fetch_jisilu_list(self, variant):
+        import requests
+
+        url = f"https://www.jisilu.cn/data/qdii/qdii_list/{variant}"
         headers = {
             "User-Agent": self._get_random_ua(),
             "Referer": "https://www.jisilu.cn/data/qdii/",
@@ -108,477 +212,419 @@ class FundMonitor:
             "X-Requested-With": "XMLHttpRequest",
         }
 
-        max_retries = 3
-        timeout = 15
         jisilu_data = {}
 
-        for attempt in range(max_retries):
-            try:
-                resp = requests.get(url, headers=headers, timeout=timeout)
-                resp.raise_for_status()
-                data = resp.json()
-
-                for row in data.get("rows", []):
-                    cell = row.get("cell", {})
-                    fund_id = cell.get("fund_id", "")
-                    if not fund_id:
-                        continue
+        try:
+            resp = self.http.get(url, headers=headers, timeout=15)
+            resp.raise_for_status()
+            data = resp.json()
+
+            for row in data.get("rows", []):
+                cell = row.get("cell", {})
+                fund_id = cell.get("fund_id", "")
+                if not fund_id:
+                    continue
 
-                    # Parse apply_status: "开放申购", "暂停申购", "限10", "限1000" etc.
-                    apply_status = cell.get("apply_status", "")
-
-                    # Parse discount_rt (premium rate): "5.22%", "-1.5%" etc.
-                    discount_rt_str = cell.get("discount_rt", "")
-                    premium_rate = None
-                    if discount_rt_str and discount_rt_str != "-":
-                        try:
-                            premium_rate = float(discount_rt_str.replace("%", ""))
-                        except (ValueError, TypeError):
-                            premium_rate = None
-
-                    jisilu_data[fund_id] = {
-                        "fund_nm": cell.get("fund_nm", ""),
-                        "apply_status": apply_status,
-                        "premium_rate": premium_rate,
-                        "discount_rt_str": discount_rt_str,
-                        "min_amt": cell.get("min_amt"),
-                    }
-
-                print(f"Jisilu: fetched {len(jisilu_data)} QDII ETF/LOF records.")
-                break
-
-            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
-                print(f"Jisilu fetch error (Attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                else:
-                    print("Failed to fetch Jisilu data. Will fall back to EastMoney for all funds.")
+                # Parse apply_status: "开放申购", "暂停申购", "限10", "限1000" etc.
+                apply_status = cell.get("apply_status", "")
+
+                # Parse discount_rt (premium rate): "5.22%", "-1.5%" etc.
+                discount_rt_str = cell.get("discount_rt", "")
+                premium_rate = None
+                if discount_rt_str and discount_rt_str != "-":
+                    try:
+                        premium_rate = float(discount_rt_str.replace("%", ""))
+                    except (ValueError, TypeError):
+                        premium_rate = None
+
+                jisilu_data[fund_id] = {
+                    "fund_nm": cell.get("fund_nm", ""),
+                    "apply_status": apply_status,
+                    "premium_rate": premium_rate,
+                    "discount_rt_str": discount_rt_str,
+                    "min_amt": cell.get("min_amt"),
+                }
+
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"Jisilu fetch error ({variant}): {e}")
+            print("Failed to fetch Jisilu data. These funds fall back to history or other sources.")
+            return None
 
         return jisilu_data
 
-    def fetch_fund_info(self, code, name, jisilu_data=None):
-        """Fetch fund info. Uses Jisilu data if available, otherwise falls back to EastMoney."""
-        info = {
-            "code": code,
-            "name": name,
-            "status": "Unknown",
-            "limit_text": "None",
-            "limit_val": -1,
-            "premium_rate": None,  # Only available for ETFs from Jisilu
+    def fetch_eastmoney_bulk_data(self, codes=None):
+        """Fetch purchase status and daily limits for all funds from EastMoney in bulk.
+
+        Uses the paged fund-list feed behind fund.eastmoney.com/data (the same
+        one AkShare's fund_purchase_em reads), so OTC share classes no longer
+        need one jbgk page request each. Returns (data, failed): data is a
+        dict keyed by fund code in the same shape as fetch_fund_info's info
+        fields, failed is true when a request or parse error stopped the
+        pagination, leaving data empty or partial. Rows with a status this
+        parser doesn't recognise are left out, so those codes still fall back
+        to the per-fund page scrape. When codes is given, only those funds are
+        kept.
+        """
+        import requests
+
+        url = "http://fund.eastmoney.com/Data/Fund_JJJZ_Data.aspx"
+        headers = {
+            "User-Agent": self._get_random_ua(),
+            "Referer": "http://fund.eastmoney.com/fund.html",
         }
+        page_size = int(self.config.get('eastmoney_bulk_page_size', 5000))
+        wanted = set(codes) if codes else None
+        bulk_data = {}
 
-        # --- Try Jisilu data first (ETFs/LOFs only) ---
-        if jisilu_data and code in jisilu_data:
-            jsl = jisilu_data[code]
-            apply_status = jsl["apply_status"]
-            info["premium_rate"] = jsl["premium_rate"]
-
-            if "暂停" in apply_status:
-                info["status"] = "暂停申购"
-                info["limit_text"] = "None"
-                info["limit_val"] = -1
-            elif apply_status == "开放申购":
-                info["status"] = "开放申购"
-                info["limit_text"] = "None"
-                info["limit_val"] = float('inf')
-            else:
-                # "限10", "限1000" etc.
-                info["status"] = apply_status
-                limit_match = re.search(r"限(\d+(?:\.\d+)?)", apply_status)
-                if limit_match:
-                    limit_num = float(limit_match.group(1))
-                    info["limit_text"] = f"{limit_match.group(1)}元"
-                    info["limit_val"] = int(limit_num)
-                else:
-                    info["limit_text"] = apply_status
-                    info["limit_val"] = 0
+        page = 1
+        pages = 1
+        failed = False
+        try:
+            while page <= pages:
+                params = {"t": "8", "page": f"{page},{page_size}", "js": "reData", "sort": "fcode,asc"}
+                resp = self.http.get(url, headers=headers, params=params, timeout=30)
+                resp.raise_for_status()
+                resp.encoding = "utf-8"
+                text = resp.text
+
+                # Response is a JS literal: var reData={datas:[[...],...],record:"...",pages:"..."}
+                datas_idx = text.find("datas:")
+                if datas_idx < 0:
+                    raise ValueError("unexpected EastMoney bulk response")
+                rows, _ = json.JSONDecoder().raw_decode(text, datas_idx + len("datas:"))
+                pages_match = re.search(r'pages:"?(\d+)', text)
+                pages = int(pages_match.group(1)) if pages_match else page
+
+                for row in rows:
+                    # [代码, 简称, 类型, 净值, 净值日期, 申购状态, 赎回状态, 下一开放日, 购买起点, 日累计限定金额, ...]
+                    if len(row) < 10:
+                        continue
+                    code = row[0]
+                    if wanted is not None and code not in wanted:
+                        continue
+                    status = row[5]
+                    try:
+                        day_limit = int(float(row[9]))
+                    except (TypeError, ValueError):
+                        day_limit = None
+
+                    entry = {"fund_nm": row[1], "status": status, "limit_text": "None"}
+                    if "暂停" in status:
+                        entry["limit_val"] = -1
+                    elif status == "开放申购" or (status == "限大额" and (day_limit is None or day_limit >= 1e11)):
+                        entry["limit_val"] = float('inf')
+                    elif status == "限大额":
+                        entry["limit_text"] = format_amount(day_limit)
+                        entry["limit_val"] = day_limit
+                    else:
+                        continue
+                    bulk_data[code] = entry
+
+                page += 1
+
+            print(f"EastMoney bulk: fetched status for {len(bulk_data)} funds in {page - 1} request(s).")
 
-            # Use Jisilu's fund name if shorter/better
-            if jsl.get("fund_nm"):
-                info["name"] = jsl["fund_nm"]
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            failed = True
+            print(f"EastMoney bulk fetch error (page {page} of {pages}): {e}")
+            print("Funds missing from the bulk feed fall back to per-fund EastMoney pages.")
 
-            print(f"  [Jisilu] {code} {info['name']}: {apply_status}, 溢价率={jsl['discount_rt_str']}")
-            return info
+        return bulk_data, failed
 
-        # --- Fallback: EastMoney per-fund scraping ---
+    def new_fund_info(self, code, name):
+        """Return the FundRecord for a fund before any source has filled it in."""
+        return FundRecord(code, name)
+
+    def fetch_eastmoney_page(self, code):
+        """Scrape one fund's EastMoney jbgk page.
+
+        Returns the status/limit fields, None if the page could not be
+        fetched or parsed, or NOT_FOUND if EastMoney has no page for code.
+        """
         url = f"http://fund.eastmoney.com/f10/jbgk_{code}.html"
         headers = {
             "User-Agent": self._get_random_ua()
         }
+        info = {"status": "Unknown", "limit_text": "None", "limit_val": -1}
 
-        max_retries = 3
-        retry_delay = 2
-        timeout = 30
+        try:
+            resp = self.http.get(url, headers=headers, timeout=30, use_cache=True)
+            if resp.status_code == 404:
+                print(f"No EastMoney page for {code}.")
+                return NOT_FOUND
+            resp.raise_for_status()
+            resp.encoding = "utf-8"
+            with self.telemetry.span("parse", code=code):
+                parsed = parse_jbgk(resp.text)
+
+            # 1. Status
+            if parsed['status']:
+                info['status'] = parsed['status']
+
+            # 2. Limit Text
+            if parsed['limit_text'] is not None:
+                info['limit_text'] = parsed['limit_text']
+            
+            # 3. Numeric Value
+            if "暂停" in info['status']:
+                info['limit_val'] = -1
+            elif info['limit_text'] != "None":
+                info['limit_val'] = self._parse_amount(info['limit_text'])
+            else:
+                info['limit_val'] = float('inf')
 
-        for attempt in range(max_retries):
-            try:
-                resp = requests.get(url, headers=headers, timeout=timeout)
-                resp.encoding = "utf-8"
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                full_text = soup.get_text()
-                
-                # 1. Status
-                status_match = re.search(r"交易状态：\s*(\S+)", full_text)
-                if status_match:
-                    info['status'] = status_match.group(1)
-                else:
-                    th = soup.find(lambda tag: tag.name in ['th', 'td'] and '交易状态' in tag.get_text())
-                    if th and th.find_next_sibling('td'):
-                        info['status'] = th.find_next_sibling('td').get_text(strip=True)
-
-                # 2. Limit Text
-                limit_match = re.search(r"（(.*单日.*上限.*)）", resp.text)
-                if limit_match:
-                     raw_limit = limit_match.group(1)
-                     clean_limit = re.sub(r'<[^>]+>', '', raw_limit)
-                     info['limit_text'] = re.sub(r"单日.*?上限", "", clean_limit).replace("（", "").replace("）", "")
-                
-                # 3. Numeric Value
-                if "暂停" in info['status']:
-                    info['limit_val'] = -1
-                elif info['limit_text'] != "None":
-                    info['limit_val'] = self._parse_amount(info['limit_text'])
-                else:
-                    info['limit_val'] = float('inf')
-                
-                # Success, break retry loop
-                break
-
-            except (requests.exceptions.RequestException, Exception) as e:
-                print(f"Error fetching {code} (Attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                else:
-                    print(f"Failed to fetch {code} after {max_retries} attempts.")
+        except Exception as e:
+            print(f"Failed to fetch {code}: {e}")
+            return None
             
         return info
 
-    def send_notification(self, message, html_message=None):
-        """Send notification via Email (preferred) or WeChat Webhook."""
-        sent_email = False
-        if self.email_sender and self.email_password and self.smtp_server and self.email_receiver:
-            sent_email = self._send_email(message, html_message)
-        
-        # If email fails or is not configured, try WeChat
-        if not sent_email:
-            if self.webhook_url and "YOUR_WECHAT" not in self.webhook_url:
-                self._send_wechat(message)
-            else:
-                print("Warning: No notification method configured. Printing message instead.")
-                print(message)
+    def fetch_fund_info(self, code, name, jisilu_data=None, eastmoney_data=None):
+        """Fetch info for a single fund through the source pipeline.
 
-    def _send_email(self, content_md, content_html=None):
-        """Send notification via SMTP Email."""
-        try:
-            receivers = [r.strip() for r in self.email_receiver.split(',') if r.strip()]
-            if not receivers:
-                return False
+        Bulk data already fetched this run (Jisilu, EastMoney bulk) is reused;
+        per-fund sources are only hit when neither covers the code.
+        """
+        prefetched = {}
+        if jisilu_data is not None:
+            prefetched[JisiluSource.name] = jisilu_data
+        if eastmoney_data is not None:
+            prefetched[EastMoneyBulkSource.name] = eastmoney_data
+        return self.pipeline.run([{"code": code, "name": name}], prefetched=prefetched, run_bulk=False)[0]
 
-            # Convert Markdown to basic HTML if custom HTML is not provided
-            if not content_html:
-                content_html = markdown.markdown(content_md)
-            
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = '基金申购限额日报'
-            msg['From'] = self.email_sender
-            msg['To'] = ", ".join(receivers)
-
-            # Plain text version for fallback
-            text_part = MIMEText(content_md, 'plain', 'utf-8')
-            # HTML version
-            html_part = MIMEText(content_html, 'html', 'utf-8')
-
-            msg.attach(text_part)
-            msg.attach(html_part)
-
-            # Connect and send
-            port = int(self.smtp_port) if self.smtp_port else 465
-            if port == 465:
-                server = smtplib.SMTP_SSL(self.smtp_server, port)
-            else:
-                server = smtplib.SMTP(self.smtp_server, port)
-                server.starttls()
-            
-            server.login(self.email_user, self.email_password)
-            server.sendmail(self.email_sender, receivers, msg.as_string())
-            server.quit()
-            
-            print(f"Email notification sent to {len(receivers)} receiver(s).")
-            return True
-        except Exception as e:
-            print(f"Failed to send email notification: {e}")
-            return False
-
-    def _send_wechat(self, message):
-        """Send notification via WeChat Webhook."""
-        headers = {'Content-Type': 'application/json'}
-        data = {
-            "msgtype": "markdown",
-            "markdown": {"content": message}
-        }
-        
+    def send_notification(self, message, html_message=None, subject='基金申购限额日报'):
+        """Queue a notification for Email and WeChat Webhook, then deliver it.
+
+        Messages left over from earlier failed deliveries are retried too.
+        """
+        if not self.notifier.channels:
+            print("Warning: No notification method configured. Printing message instead.")
+            print(message)
+            return
+
+        receivers = [r.strip() for r in (self.email_receiver or '').split(',') if r.strip()]
+        if receivers:
+            self.notifier.enqueue(message, html_message, subject, receivers)
+        else:
+            # Subscribers only: the full report goes to the non-email channels
+            self.notifier.enqueue(message, html_message, subject, channels=[c for c in self.notifier.channels if c != SmtpChannel.name])
+        self.notifier.flush()
+
+    def send_digests(self, model, subject='基金申购限额日报'):
+        """Queue one personalized email digest per subscriber, rendered from the shared model.
+
+        The digests are delivered by the next flush over a single SMTP session.
+        """
+        if SmtpChannel.name not in self.notifier.channels:
+            if self.subscriptions:
+                print("Warning: Subscriptions configured but email is not; skipping digests.")
+            return 0
+        count = 0
+        for sub, text, html in render_digests(model, self.subscriptions):
+            self.notifier.enqueue(text, html, f"{subject} · {sub.name}", [sub.email], channels=[SmtpChannel.name])
+            count += 1
+        print(f"Queued {count} personalized digest(s).")
+        return count
+
+    def quota_notes(self):
+        """Summaries of each fund's quota history for the report's 近况 column.
+
+        Enabled with report_analytics in config.json; computed for all funds at
+        once from the history store.
+        """
+        if not self.config.get('report_analytics'):
+            return {}
+        from analytics import compute_quota_analytics, load_limit_matrix, summarize
+
+        window = int(self.config.get('analytics_window', 20))
         try:
-            resp = requests.post(self.webhook_url, json=data, headers=headers)
-            print(f"WeChat notification sent. Status: {resp.status_code}")
+            matrix = load_limit_matrix(self.history_store)
+            return summarize(compute_quota_analytics(matrix, window), window)
         except Exception as e:
-            print(f"Failed to send WeChat notification: {e}")
+            print(f"Quota analytics failed: {e}")
+            return {}
 
-    def generate_html_report(self, funds_data):
-        """Generate a modern, responsive HTML report with a table and delta tracking."""
-        # Categorize
-        groups = {
-            "可申购": {"纳斯达克100": [], "标普500": [], "其他": []},
-            "不可申购": {"纳斯达克100": [], "标普500": [], "其他": []}
-        }
+    def alert_engine(self, exclude_latest=False):
+        """AlertEngine for the premium rules in config "alerts", or None when there are none.
 
-        for info in funds_data:
-            is_paused = "暂停" in info['status']
-            category = "不可申购" if (is_paused or info['limit_val'] == 0) else "可申购"
-            idx_type = self._get_index_type(info['name'])
-            groups[category].get(idx_type, groups[category]["其他"]).append(info)
-
-        last_limits = self.history.get('limits', {})
-        now_time = time.strftime('%Y-%m-%d %H:%M:%S')
-
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <meta charset="utf-8">
-        </head>
-        <body style="margin: 0; padding: 0; background-color: #f4f7f9; font-family: 'Segoe UI', Roboto, Helvetica, Arial, sans-serif;">
-            <table border="0" cellpadding="0" cellspacing="0" width="100%">
-                <tr>
-                    <td align="center" style="padding: 20px 0;">
-                        <table border="0" cellpadding="0" cellspacing="0" width="100%" style="max-width: 800px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; overflow: hidden; box-shadow: 0 10px 25px rgba(0,0,0,0.05);">
-                            <!-- Header -->
-                            <tr>
-                                <td style="padding: 40px 30px; background: linear-gradient(135deg, #1a365d 0%, #2c5282 100%);">
-                                    <h2 style="margin: 0 0 8px 0; color: #ffffff; font-size: 28px; font-weight: 700;">基金申购限额日报</h2>
-                                    <p style="margin: 0; color: #ebf8ff; font-size: 14px; opacity: 0.9;">更新时间: {now_time}</p>
-                                </td>
-                            </tr>
+        exclude_latest leaves the newest stored run out of the statistics, for
+        evaluating a run that has already been saved.
         """
+        rules = self.config.get('alerts') or []
+        if not rules:
+            return None
+        from alerts import AlertEngine
 
-        for category, section_data in groups.items():
-            total_count = sum(len(v) for v in section_data.values())
-            if total_count == 0:
-                continue
+        try:
+            return AlertEngine(self.history_store, rules, window=int(self.config.get('alerts_window', 20)),
+                               exclude_latest=exclude_latest)
+        except Exception as e:
+            print(f"Alert engine failed to load history: {e}")
+            return None
+
+    def send_alerts(self, alerts):
+        from alerts import format_alerts
+
+        print(f"Alerts: {len(alerts)} fired.")
+        self.send_notification(format_alerts(alerts, self._shorten_name), subject='基金溢价提醒')
+
+    def build_report_model(self, funds_data, notes=None):
+        """Group and rank funds once, annotated with changes versus history."""
+        return build_report_model(
+            funds_data,
+            self.history.get('limits', {}),
+            self.classifier.classify,
+            notes=notes,
+            index_types=self.classifier.index_types,
+        )
+
+    def generate_html_report(self, funds_data, model=None):
+        """Generate a modern, responsive HTML report with a table and delta tracking."""
+        out = io.StringIO()
+        render_html(model or self.build_report_model(funds_data), out)
+        return out.getvalue()
+
+    def generate_report(self, funds_data, model=None):
+        """Generate the Markdown report (used for WeChat and the plain-text email part)."""
+        out = io.StringIO()
+        render_markdown(model or self.build_report_model(funds_data), out)
+        return out.getvalue()
+
+    def fetch(self):
+        """Fetch every configured fund and append the run to the history store."""
+        print(f"Fetching data for {len(self.funds_config)} funds...")
 
-            section_color = "#38a169" if category == "可申购" else "#e53e3e"
-            section_bg = "#f0fff4" if category == "可申购" else "#fff5f5"
-            
-            html += f"""
-                            <!-- Section: {category} -->
-                            <tr>
-                                <td style="padding: 30px 30px 10px 30px;">
-                                    <h3 style="margin: 0; color: {section_color}; font-size: 20px; border-bottom: 2px solid {section_color}; padding-bottom: 8px; display: inline-block;">{category}</h3>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 20px 30px;">
-            """
-
-            for idx_name in ["纳斯达克100", "标普500", "其他"]:
-                funds = section_data.get(idx_name, [])
-                if not funds:
-                    continue
-                
-                html += f"""
-                                    <h4 style="margin: 20px 0 12px 0; color: #4a5568; font-size: 16px; font-weight: 600;">{idx_name}</h4>
-                                    <table width="100%" style="border-collapse: collapse; margin-bottom: 10px;">
-                                        <thead>
-                                            <tr style="background-color: #f8fafc; border-bottom: 2px solid #edf2f7;">
-                                                <th align="left" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">基金名称</th>
-                                                <th align="center" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">当前状态</th>
-                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">今日限额</th>
-                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">较昨日变化</th>
-                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">溢价率</th>
-                                            </tr>
-                                        </thead>
-                                        <tbody>
-                """
-                
-                for f in funds:
-                    s_name = self._shorten_name(f['name'])
-                    code = f['code']
-                    status = f['status']
-                    limit_text = f['limit_text']
-                    limit_val = f['limit_val']
-                    
-                    # Status Styling
-                    status_style = "color: #38a169; font-weight: 600;" if "暂停" not in status else "color: #e53e3e; font-weight: 600;"
-                    
-                    # Comparison Logic
-                    prev_val = last_limits.get(code)
-                    change_html = '<span style="color: #a0aec0;">-</span>'
-                    
-                    if prev_val is not None:
-                        # Normalize values for infinity comparison
-                        v_curr = limit_val if limit_val != float('inf') else 9999999999
-                        v_prev = prev_val if prev_val != float('inf') else 9999999999
-                        
-                        if v_curr > v_prev:
-                            diff = v_curr - v_prev
-                            diff_text = f"+{limit_text}" if v_prev == 0 else f"+{int(diff)}"
-                            if v_curr >= 9999999999: diff_text = "恢复不限额"
-                            change_html = f'<span style="color: #38a169; font-weight: bold;">↑ {diff_text}</span>'
-                        elif v_curr < v_prev:
-                            diff = v_prev - v_curr
-                            diff_text = f"-{int(diff)}" if v_curr != 0 else "进入暂停"
-                            if v_curr == -1: diff_text = "暂停申购"
-                            change_html = f'<span style="color: #e53e3e; font-weight: bold;">↓ {diff_text}</span>'
-
-                    # Display Limit
-                    disp_limit = limit_text if limit_text != "None" else ("不限额" if limit_val == float('inf') else status)
-                    if limit_val == -1: disp_limit = "暂停"
-
-                    # Premium Rate Styling
-                    premium_rate = f.get('premium_rate')
-                    if premium_rate is not None:
-                        if premium_rate > 1:
-                            pr_style = "color: #e53e3e; font-weight: 600;"
-                        elif premium_rate < 0:
-                            pr_style = "color: #38a169; font-weight: 600;"
-                        else:
-                            pr_style = "color: #2d3748; font-weight: 600;"
-                        pr_display = f"{premium_rate:.2f}%"
-                    else:
-                        pr_style = "color: #a0aec0;"
-                        pr_display = "N/A"
-
-                    html += f"""
-                                            <tr style="border-bottom: 1px solid #edf2f7;">
-                                                <td style="padding: 14px 8px; font-size: 14px;"><strong>{s_name}</strong> <br><span style="color: #a0aec0; font-size: 12px;">{code}</span></td>
-                                                <td align="center" style="padding: 14px 8px; font-size: 14px; {status_style}">{status}</td>
-                                                <td align="right" style="padding: 14px 8px; font-size: 14px; font-weight: 600; color: #2d3748;">{disp_limit}</td>
-                                                <td align="right" style="padding: 14px 8px; font-size: 14px;">{change_html}</td>
-                                                <td align="right" style="padding: 14px 8px; font-size: 14px; {pr_style}">{pr_display}</td>
-                                            </tr>
-                    """
-                
-                html += "                                        </tbody></table>"
-            
-            html += "                                </td></tr>"
-
-        html += """
-                            <!-- Footer -->
-                            <tr>
-                                <td style="padding: 30px; background-color: #f8fafc; border-top: 1px solid #edf2f7; color: #a0aec0; font-size: 12px; text-align: center;">
-                                    <p style="margin: 0 0 5px 0;">此邮件由 <strong>Fund Limit Monitor</strong> 自动发送</p>
-                                    <p style="margin: 0;">数据源: 集思录 / 天天基金网 | 仅供个人参考</p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
+        # Bulk sources first (Jisilu, EastMoney bulk), then per-fund pages for the rest
+        self.pipeline.reset_stats()
+        scheduler = None
+        if self.incremental:
+            scheduler = IncrementalScheduler(
+                self.history_store,
+                stable_days=int(self.config.get('incremental_stable_days', 5)),
+                max_stale_days=int(self.config.get('incremental_max_stale_days', 3)),
+            )
+        fetch_pending = None
+        if self.shards > 1:
+            from sharding import ShardedFetcher
+
+            fetch_pending = ShardedFetcher(self, self.shards)
+        # Past the deadline no new fetch starts; the report goes out with what is complete
+        deadline_seconds = float(self.config.get('run_deadline_seconds', 300))
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds > 0 else None
+        with self.telemetry.span("fetch"):
+            funds_data = self.pipeline.run(self.funds_config, scheduler=scheduler,
+                                           fetch_pending=fetch_pending, deadline=deadline)
+        self.pipeline.print_stats()
+        return funds_data
+
+    def stored_run(self):
+        """Rebuild funds_data from the latest stored run, without fetching.
+
+        self.history is moved back to the run before it, so report deltas and
+        alert statistics compare against the same baseline as a live run.
+        Returns None when the store has no runs yet.
         """
-        return html
-
-    def generate_report(self, funds_data):
-        # Sort by limit value descending
-        funds_data.sort(key=lambda x: x['limit_val'], reverse=True)
-        
-        # Categorize
-        groups = {
-            "可申购": {"纳斯达克100": [], "标普500": [], "其他": []},
-            "不可申购": {"纳斯达克100": [], "标普500": [], "其他": []}
-        }
-
-        for info in funds_data:
-            is_paused = "暂停" in info['status']
-            category = "不可申购" if (is_paused or info['limit_val'] == 0) else "可申购"
-            
-            idx_type = self._get_index_type(info['name'])
-            if idx_type not in groups[category]:
-                groups[category]["其他"] = groups[category].get("其他", [])
-                groups[category]["其他"].append(info)
-            else:
-                groups[category][idx_type].append(info)
-
-        # Build Message
-        report_lines = ["# 基金申购限额日报 (A类)", f"> 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}"]
-        
-        last_limits = self.history.get('limits', {})
+        runs = self.history_store.recent_runs(2)
+        if not runs:
+            return None
+        run_id, run_date = runs[0]
+        snapshot = self.history_store.snapshot(run_id)
+        names = {f['code']: f['name'] for f in self.funds_config}
+        funds_data = []
+        for code, obs in snapshot.items():
+            info = self.new_fund_info(code, names.get(code, code))
+            info.update(obs, status=obs['status'] or info.status, limit_text=limit_text_of(obs['limit_val']))
+            funds_data.append(info)
+        if len(runs) > 1:
+            previous = runs[1]
+            self.history = {"date": previous[1], "limits": {
+                code: obs['limit_val'] for code, obs in self.history_store.snapshot(previous[0]).items()}}
+        else:
+            self.history = {}
+        print(f"Loaded {len(funds_data)} funds from the run of {run_date}.")
+        return funds_data
+
+    def publish(self, funds_data, exclude_latest=False):
+        """Render the report and send digests, the broadcast and any alerts.
+
+        Returns the report model.
+        """
+        with self.telemetry.span("analytics"):
+            notes = self.quota_notes()
+        with self.telemetry.span("render"):
+            model = self.build_report_model(funds_data, notes)
+            message = self.generate_report(funds_data, model)
+            html_message = self.generate_html_report(funds_data, model)
+        with self.telemetry.span("alerts"):
+            engine = self.alert_engine(exclude_latest)
+            alerts = engine.evaluate(funds_data) if engine else []
+        with self.telemetry.span("notify"):
+            self.send_digests(model)
+            self.send_notification(message, html_message)
+            if alerts:
+                self.send_alerts(alerts)
+        return model
+
+    def export_dashboard(self, model, out_dir, force=False):
+        """Write the static dashboard for model and the stored history to out_dir.
+
+        Only the files of funds whose data changed are rewritten (see dashboard.py).
+        """
+        from dashboard import DashboardExporter, load_series
 
-        def add_section(title, grouped_funds):
-            total_count = sum(len(v) for v in grouped_funds.values())
-            if total_count == 0:
-                return
+        try:
+            stats = DashboardExporter(out_dir).export(model, load_series(self.history_store), force)
+        except Exception as e:
+            print(f"Dashboard export failed: {e}")
+            return None
+        print(f"Dashboard: {stats['rendered']} fund(s) re-rendered, {stats['written']} file(s) written, "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed ({out_dir}).")
+        return stats
 
-            report_lines.append(f"## {title}")
-            
-            for idx_name in ["纳斯达克100", "标普500", "其他"]:
-                funds = grouped_funds.get(idx_name, [])
-                if not funds:
-                    continue
-                
-                report_lines.append(f"### {idx_name}")
-                
-                for f in funds:
-                    s_name = self._shorten_name(f['name'])
-                    code = f['code']
-                    limit_text = f['limit_text']
-                    limit_val = f['limit_val']
-                    
-                    # Emoji
-                    emoji = "🔴" if title == "不可申购" else ""
-                    
-                    # Comparison Arrow
-                    arrow = ""
-                    prev = last_limits.get(code)
-                    if prev is not None:
-                        if limit_val > prev: arrow = " ↑"
-                        elif limit_val < prev: arrow = " ↓"
-
-                    line = f"{s_name}({code}) {emoji}"
-                    
-                    if title == "可申购" and limit_text != "None":
-                        line += f" : {limit_text}{arrow}"
-                    elif title == "可申购" and limit_val == float('inf') and arrow:
-                        line += f" : 不限{arrow}"
-
-                    # Append premium rate if available
-                    premium_rate = f.get('premium_rate')
-                    if premium_rate is not None:
-                        line += f" [溢价率: {premium_rate:.2f}%]"
-                    
-                    report_lines.append(line.strip())
-
-        add_section("可申购", groups["可申购"])
-        add_section("不可申购", groups["不可申购"])
-        
-        return "\n".join(report_lines)
+    def close(self):
+        self.classifier.save()
+        self.notifier.close()
+        self.http.close()
 
     def run(self):
-        funds_data = []
-        print(f"Fetching data for {len(self.funds_config)} funds...")
+        funds_data = self.fetch()
+        model = self.publish(funds_data)
 
-        # Fetch Jisilu QDII ETF/LOF data in bulk first
-        print("Fetching Jisilu QDII data...")
-        jisilu_data = self.fetch_jisilu_qdii_data()
-        
-        for fund in self.funds_config:
-            info = self.fetch_fund_info(fund['code'], fund['name'], jisilu_data)
-            funds_data.append(info)
-            # Only sleep between EastMoney requests (Jisilu uses bulk fetch)
-            if fund['code'] not in jisilu_data:
-                time.sleep(0.5)
-            
-        message = self.generate_report(funds_data)
-        html_message = self.generate_html_report(funds_data)
-        self.send_notification(message, html_message)
-        
         # Save History
-        curr_limits = {f['code']: f['limit_val'] for f in funds_data}
-        self._save_history({"date": time.strftime('%Y-%m-%d'), "limits": curr_limits})
+        with self.telemetry.span("history.save"):
+            self._save_history(funds_data)
+
+        # Static dashboard, after saving so the pages include this run
+        dashboard_dir = self.config.get('dashboard_dir')
+        if dashboard_dir:
+            with self.telemetry.span("dashboard"):
+                self.export_dashboard(model, dashboard_dir)
+        self.close()
+
+        self.telemetry.print_summary()
+        if self.summary_file:
+            self.telemetry.write_summary(self.summary_file, {"sources": self.pipeline.stats})
+
+    def watch(self, until=None):
+        """Run intraday watch mode until the given local time (HH:MM)."""
+        import asyncio
+        from watch import FundWatcher
+
+        watcher = FundWatcher(
+            self,
+            bulk_interval=float(self.config.get('watch_bulk_interval', 60)),
+            full_interval=float(self.config.get('watch_full_interval', 600)),
+            limit_threshold=float(self.config.get('watch_limit_threshold', 1000)),
+            until=until or self.config.get('watch_until'),
+        )
+        try:
+            asyncio.run(watcher.run())
+        except KeyboardInterrupt:
+            print("Watch: interrupted.")
+        finally:
+            self.close()
 
 if __name__ == "__main__":
-    monitor = FundMonitor()
-    monitor.run()
+    from cli import main
+
+    main()
@@ -0,0 +1,247 @@
+import json
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class NotificationQueue:
+    """Persistent outbound queue: one JSON file per pending message.
+
+    Messages survive a crashed or failed run and are retried by the next
+    dispatcher flush. Messages that keep failing are moved to failed/.
+    """
+
+    def __init__(self, path='.outbox'):
+        self.path = path
+        self.failed_path = os.path.join(path, 'failed')
+
+    def _job_path(self, job_id, base=None):
+        return os.path.join(base or self.path, f"{job_id}.json")
+
+    def put(self, job):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self._job_path(job['id']) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, self._job_path(job['id']))
+
+    def pending(self):
+        """Return queued jobs that are due, oldest first."""
+        if not os.path.isdir(self.path):
+            return []
+        jobs = []
+        now = time.time()
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.path, name), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable queued notification {name}: {e}")
+                continue
+            if job.get('next_attempt_at', 0) <= now:
+                jobs.append(job)
+        return sorted(jobs, key=lambda j: j['created_at'])
+
+    def ack(self, job):
+        try:
+            os.remove(self._job_path(job['id']))
+        except OSError:
+            pass
+
+    def dead_letter(self, job):
+        os.makedirs(self.failed_path, exist_ok=True)
+        os.replace(self._job_path(job['id']), self._job_path(job['id'], self.failed_path))
+
+
+class SmtpChannel:
+    """SMTP email channel keeping one authenticated connection across messages.
+
+    smtplib, the email package and markdown are imported on first send.
+    """
+
+    name = 'email'
+
+    def __init__(self, server, port, user, password, sender, starttls=True, timeout=30):
+        self.server = server
+        self.port = int(port) if port else 465
+        self.user = user
+        self.password = password
+        self.sender = sender
+        self.starttls = starttls
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        import smtplib
+
+        if self.port == 465:
+            conn = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout)
+        else:
+            conn = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+            if self.starttls:
+                conn.starttls()
+        if self.user and self.password:
+            conn.login(self.user, self.password)
+        return conn
+
+    def _build(self, job):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        import markdown
+
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = job['subject']
+        msg['From'] = self.sender
+        msg['To'] = ", ".join(job['receivers'])
+
+        # Plain text version for fallback, HTML version (Markdown converted if not provided)
+        msg.attach(MIMEText(job['text'], 'plain', 'utf-8'))
+        msg.attach(MIMEText(job.get('html') or markdown.markdown(job['text']), 'html', 'utf-8'))
+        return msg.as_string()
+
+    def send(self, job):
+        import smtplib
+
+        payload = self._build(job)
+        for reconnect in (False, True):
+            try:
+                if self.conn is None or reconnect:
+                    self.close()
+                    self.conn = self._connect()
+                self.conn.sendmail(self.sender, job['receivers'], payload)
+                print(f"Email notification sent to {len(job['receivers'])} receiver(s).")
+                return
+            except smtplib.SMTPServerDisconnected:
+                # Reused connection went stale (idle timeout); reconnect once
+                if reconnect:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            import smtplib
+
+            try:
+                self.conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.conn = None
+
+
+class WebhookChannel:
+    """WeChat work robot webhook channel (Markdown message)."""
+
+    name = 'wechat'
+
+    def __init__(self, http, url, timeout=10):
+        self.http = http
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, job):
+        data = {
+            "msgtype": "markdown",
+            "markdown": {"content": job['text']}
+        }
+        # A retried POST may deliver the message twice; the dispatcher owns retries
+        resp = self.http.post(self.url, json=data, headers={'Content-Type': 'application/json'},
+                              timeout=self.timeout, retry=False)
+        resp.raise_for_status()
+        try:
+            errcode = resp.json().get('errcode', 0)
+        except ValueError:
+            errcode = 0
+        if errcode:
+            raise RuntimeError(f"webhook returned errcode {errcode}: {resp.text[:200]}")
+        print(f"WeChat notification sent. Status: {resp.status_code}")
+
+    def close(self):
+        pass
+
+
+class NotificationDispatcher:
+    """Queues notifications to disk and delivers them to every channel.
+
+    Each message becomes one job per configured channel. flush() delivers
+    due jobs with the channels running in parallel (messages within a
+    channel share one connection), retrying each with jittered exponential
+    backoff. Jobs still failing stay queued for the next flush. After
+    max_total_attempts they are moved to the failed/ folder.
+    """
+
+    def __init__(self, channels, queue, max_attempts=3, max_total_attempts=12,
+                 backoff_base=2.0, backoff_cap=60.0):
+        self.channels = {c.name: c for c in channels}
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.max_total_attempts = max_total_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def enqueue(self, text, html=None, subject='基金申购限额日报', receivers=None, channels=None):
+        """Queue a message for every configured channel (or only those named), returning the job ids."""
+        ids = []
+        for name in self.channels:
+            if channels is not None and name not in channels:
+                continue
+            job = {
+                "id": f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}",
+                "channel": name,
+                "subject": subject,
+                "text": text,
+                "html": html,
+                "receivers": receivers or [],
+                "attempts": 0,
+                "created_at": time.time(),
+                "next_attempt_at": 0,
+            }
+            self.queue.put(job)
+            ids.append(job['id'])
+        return ids
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** (attempt - 1))))
+
+    def _deliver(self, channel, jobs):
+        delivered = 0
+        for job in jobs:
+            for attempt in range(1, self.max_attempts + 1):
+                job['attempts'] += 1
+                try:
+                    channel.send(job)
+                    self.queue.ack(job)
+                    delivered += 1
+                    break
+                except Exception as e:
+                    print(f"Failed to send {channel.name} notification (Attempt {attempt}/{self.max_attempts}): {e}")
+                    if attempt < self.max_attempts:
+                        time.sleep(self._backoff(attempt))
+            else:
+                if job['attempts'] >= self.max_total_attempts:
+                    print(f"Giving up on {channel.name} notification {job['id']} after {job['attempts']} attempts.")
+                    self.queue.dead_letter(job)
+                else:
+                    job['next_attempt_at'] = time.time() + self._backoff(job['attempts'])
+                    self.queue.put(job)
+        return delivered
+
+    def flush(self):
+        """Deliver all due jobs; returns {channel: delivered count}."""
+        by_channel = {}
+        for job in self.queue.pending():
+            if job['channel'] in self.channels:
+                by_channel.setdefault(job['channel'], []).append(job)
+        if not by_channel:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(by_channel)) as executor:
+            futures = {name: executor.submit(self._deliver, self.channels[name], jobs)
+                       for name, jobs in by_channel.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self):
+        for channel in self.channels.values():
+            channel.close()
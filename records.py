@@ -0,0 +1,164 @@
+"""Typed per-fund records and a columnar batch of them.
+
+A FundRecord is what the source pipeline produces for each fund: a
+__slots__ object instead of an info dict, with the purchase state parsed
+once into a Status. Records still answer info['key'] and info.get('key'),
+so code written against the old dicts keeps working while hot paths use
+attributes.
+
+FundBatch lays a list of records out as columns (stdlib arrays, so numpy
+can wrap them with np.frombuffer without a copy and without making numpy
+an import-time dependency) for ranking, grouping and history diffing.
+"""
+import enum
+from array import array
+
+# limit_val sentinels, as stored in history and shown in reports
+UNLIMITED = float('inf')
+PAUSED_LIMIT = -1
+
+NAN = float('nan')
+
+
+def format_amount(amount):
+    """Format a yuan amount the way EastMoney pages display daily limits."""
+    if amount >= 10000 and amount % 10000 == 0:
+        return f"{amount // 10000}万元"
+    return f"{amount}元"
+
+
+def limit_text_of(limit_val):
+    """limit_text for a limit_val known without its source text (e.g. from history)."""
+    return format_amount(int(limit_val)) if 0 < limit_val < UNLIMITED else "None"
+
+
+def format_limit(limit_val):
+    """Display text for a limit_val: 不限额, 暂停 or the amount."""
+    if limit_val == UNLIMITED:
+        return "不限额"
+    if limit_val == PAUSED_LIMIT:
+        return "暂停"
+    return format_amount(int(limit_val))
+
+
+class Status(enum.IntEnum):
+    """Purchase state of a fund, derived from its status text and limit."""
+
+    UNKNOWN = 0  # not fetched, or no status found on the page
+    OPEN = 1     # 开放申购 without a daily limit
+    LIMITED = 2  # open with a daily limit (限大额, 限1000, ...)
+    PAUSED = 3   # 暂停申购
+
+    @classmethod
+    def of(cls, status, limit_val):
+        if not status or status == "Unknown":
+            return cls.UNKNOWN
+        if "暂停" in status:
+            return cls.PAUSED
+        if limit_val == UNLIMITED:
+            return cls.OPEN
+        return cls.LIMITED
+
+
+class FundRecord:
+    """One fund's state for a run.
+
+    status is the source's status text (shown in reports and stored in
+    history), state its parsed Status, kept in step by update().
+    limit_val is the daily limit in yuan, UNLIMITED or PAUSED_LIMIT.
+    """
+
+    __slots__ = ("code", "name", "status", "state", "limit_text", "limit_val",
+                 "premium_rate", "source", "stale", "as_of")
+
+    def __init__(self, code, name, status="Unknown", limit_text="None", limit_val=PAUSED_LIMIT,
+                 premium_rate=None, source=None, stale=False, as_of=None):
+        self.code = code
+        self.name = name
+        self.status = status
+        self.limit_text = limit_text
+        self.limit_val = limit_val
+        self.premium_rate = premium_rate  # Only available for ETFs from Jisilu
+        self.source = source
+        self.stale = stale
+        self.as_of = as_of
+        self.state = Status.of(status, limit_val)
+
+    def update(self, fields=(), **kwargs):
+        """Set fields from a dict of info fields (as returned by sources)."""
+        for key, value in dict(fields, **kwargs).items():
+            if key == "state" or key not in self.__slots__:
+                raise KeyError(key)
+            setattr(self, key, value)
+        self.state = Status.of(self.status, self.limit_val)
+
+    @property
+    def paused(self):
+        return self.state is Status.PAUSED
+
+    @property
+    def purchasable(self):
+        """Known, not paused and with a non-zero limit."""
+        return (self.state is Status.OPEN or self.state is Status.LIMITED) and self.limit_val != 0
+
+    # Mapping access for code written against the info dicts
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"FundRecord({self.code!r}, {self.name!r}, {self.status!r}, {self.limit_val!r})"
+
+
+class FundBatch:
+    """Columnar view of a run's records, in input order.
+
+    codes and records are lists; state (int8), limit and premium (float64,
+    NaN when not reported) are arrays. Row i of every column is records[i].
+    """
+
+    __slots__ = ("records", "codes", "state", "limit", "premium")
+
+    def __init__(self, records):
+        self.records = records
+        self.codes = [r.code for r in records]
+        self.state = array('b', [r.state for r in records])
+        self.limit = array('d', [r.limit_val for r in records])
+        self.premium = array('d', [NAN if r.premium_rate is None else r.premium_rate for r in records])
+
+    def __len__(self):
+        return len(self.records)
+
+    def ranked(self):
+        """Row indexes by limit, highest first; ties keep input order.
+
+        Limits take few distinct values (unlimited, paused, 0 and a handful
+        of amounts), so rows are bucketed by value in one pass and only the
+        distinct values are sorted.
+        """
+        buckets = {}
+        for i, value in enumerate(self.limit):
+            bucket = buckets.get(value)
+            if bucket is None:
+                bucket = buckets[value] = []
+            bucket.append(i)
+        return [i for value in sorted(buckets, reverse=True) for i in buckets[value]]
+
+    def previous(self, last_limits):
+        """Each row's limit in last_limits (history.json's {code: limit}), NaN when absent."""
+        get = last_limits.get
+        return array('d', [NAN if (v := get(code)) is None else v for code in self.codes])
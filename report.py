@@ -0,0 +1,330 @@
+import time
+from string import Template
+
+from records import PAUSED_LIMIT, UNLIMITED, FundBatch, Status
+
+CATEGORIES = ["可申购", "不可申购"]
+INDEX_TYPES = ["纳斯达克100", "标普500", "其他"]
+
+# Delta of a fund without a previous limit, or with an unchanged one
+NO_CHANGE = (None, 0, "")
+
+
+def compute_deltas(batch, last_limits):
+    """Join a run with the previous run's limits in one pass.
+
+    Returns one (direction, magnitude, change_text) per batch row, with
+    direction "up"/"down"/None, magnitude the change in yuan (inf or -inf
+    when the fund became or stopped being unlimited) and change_text the
+    report's 较昨日变化 label.
+    """
+    deltas = []
+    for info, v_prev in zip(batch.records, batch.previous(last_limits)):
+        v_curr = info.limit_val
+        # NaN (not in the previous run) compares unequal to everything
+        if v_prev != v_prev or v_curr == v_prev:
+            deltas.append(NO_CHANGE)
+            continue
+        magnitude = v_curr - v_prev
+        if magnitude > 0:
+            if v_curr == UNLIMITED:
+                change_text = "恢复不限额"
+            elif v_prev == 0:
+                change_text = f"+{info.limit_text}"
+            else:
+                change_text = f"+{int(magnitude)}"
+            deltas.append(("up", magnitude, change_text))
+        else:
+            if v_curr == PAUSED_LIMIT:
+                change_text = "暂停申购"
+            elif v_curr == 0:
+                change_text = "进入暂停"
+            elif v_prev == UNLIMITED:
+                change_text = "开始限额"
+            else:
+                change_text = f"-{int(-magnitude)}"
+            deltas.append(("down", magnitude, change_text))
+    return deltas
+
+
+def _build_row(info, delta, classes, note=None):
+    """Precompute everything both renderers need for one FundRecord."""
+    limit_text = info.limit_text
+    limit_val = info.limit_val
+    status = info.status
+    direction, magnitude, change_text = delta
+
+    disp_limit = limit_text if limit_text != "None" else ("不限额" if limit_val == UNLIMITED else status)
+    if limit_val == PAUSED_LIMIT: disp_limit = "暂停"
+
+    # Limit shown after the name in the Markdown report (purchasable funds only)
+    if limit_text != "None":
+        md_limit = limit_text
+    elif limit_val == UNLIMITED and direction:
+        md_limit = "不限"
+    else:
+        md_limit = None
+
+    return {
+        "name": classes['short_name'],
+        "full_name": info.name,
+        "share_class": classes['share_class'],
+        "code": info.code,
+        "status": status,
+        "paused": info.state is Status.PAUSED,
+        "limit_text": limit_text,
+        "limit_val": limit_val,
+        "disp_limit": disp_limit,
+        "md_limit": md_limit,
+        "direction": direction,
+        "change": magnitude,
+        "change_text": change_text,
+        "premium_rate": info.premium_rate,
+        "note": note,
+        "stale_as_of": info.as_of if info.stale else None,
+    }
+
+
+def build_report_model(funds_data, last_limits, classify, now_time=None, notes=None, index_types=INDEX_TYPES):
+    """Group, rank and annotate funds once for every renderer.
+
+    funds_data is a list of FundRecords or a FundBatch of them. The change
+    versus last_limits is computed for all funds in one join
+    (compute_deltas). Funds are then dealt into 可申购/不可申购 x index type
+    buckets in limit_val order (descending, see FundBatch.ranked), with
+    groups in index_types order. classify(code, name) supplies each fund's
+    short name, index type and share class. Each row carries its display
+    values, so renderers only format. notes optionally maps code -> text
+    shown in an extra 近况 column (e.g. history analytics).
+    """
+    notes = notes or {}
+    groups = {category: {idx: [] for idx in index_types} for category in CATEGORIES}
+
+    batch = funds_data if isinstance(funds_data, FundBatch) else FundBatch(funds_data)
+    deltas = compute_deltas(batch, last_limits)
+    for i in batch.ranked():
+        info = batch.records[i]
+        category = "不可申购" if (batch.state[i] == Status.PAUSED or batch.limit[i] == 0) else "可申购"
+        classes = classify(info.code, info.name)
+        idx_type = classes['index_type']
+        if idx_type not in groups[category]:
+            idx_type = "其他"
+        row = _build_row(info, deltas[i], classes, notes.get(info.code))
+        row['category'] = category
+        row['index_type'] = idx_type
+        groups[category][idx_type].append(row)
+
+    sections = []
+    for category in CATEGORIES:
+        index_groups = [{"index": idx, "rows": groups[category][idx]}
+                        for idx in index_types if groups[category][idx]]
+        if index_groups:
+            sections.append({"title": category, "groups": index_groups})
+
+    return {
+        "generated_at": now_time or time.strftime('%Y-%m-%d %H:%M:%S'),
+        "sections": sections,
+        "show_notes": bool(notes),
+    }
+
+
+# --- Markdown ---
+
+MD_HEADER = Template("# 基金申购限额日报 (A类)\n> 时间: $now_time")
+
+
+def render_markdown(model, out):
+    """Write the Markdown report for model to the file-like out."""
+    write = out.write
+    write(MD_HEADER.substitute(now_time=model['generated_at']))
+    for section in model['sections']:
+        title = section['title']
+        available = title == "可申购"
+        emoji = "" if available else "🔴"
+        write(f"\n## {title}")
+        for group in section['groups']:
+            write(f"\n### {group['index']}")
+            for row in group['rows']:
+                arrow = {"up": " ↑", "down": " ↓"}.get(row['direction'], "")
+                line = f"{row['name']}({row['code']}) {emoji}"
+                if available and row['md_limit']:
+                    line += f" : {row['md_limit']}{arrow}"
+
+                # Append premium rate if available
+                if row['premium_rate'] is not None:
+                    line += f" [溢价率: {row['premium_rate']:.2f}%]"
+                if row['note']:
+                    line += f" ({row['note']})"
+                if row['stale_as_of']:
+                    line += f" [沿用 {row['stale_as_of']}]"
+                write("\n" + line.strip())
+
+
+# --- HTML ---
+
+HTML_HEADER = Template("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <meta charset="utf-8">
+        </head>
+        <body style="margin: 0; padding: 0; background-color: #f4f7f9; font-family: 'Segoe UI', Roboto, Helvetica, Arial, sans-serif;">
+            <table border="0" cellpadding="0" cellspacing="0" width="100%">
+                <tr>
+                    <td align="center" style="padding: 20px 0;">
+                        <table border="0" cellpadding="0" cellspacing="0" width="100%" style="max-width: 800px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; overflow: hidden; box-shadow: 0 10px 25px rgba(0,0,0,0.05);">
+                            <!-- Header -->
+                            <tr>
+                                <td style="padding: 40px 30px; background: linear-gradient(135deg, #1a365d 0%, #2c5282 100%);">
+                                    <h2 style="margin: 0 0 8px 0; color: #ffffff; font-size: 28px; font-weight: 700;">基金申购限额日报</h2>
+                                    <p style="margin: 0; color: #ebf8ff; font-size: 14px; opacity: 0.9;">更新时间: $now_time</p>
+                                </td>
+                            </tr>
+        """)
+
+HTML_SECTION_OPEN = Template("""
+                            <!-- Section: $title -->
+                            <tr>
+                                <td style="padding: 30px 30px 10px 30px;">
+                                    <h3 style="margin: 0; color: $color; font-size: 20px; border-bottom: 2px solid $color; padding-bottom: 8px; display: inline-block;">$title</h3>
+                                </td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 0 30px 20px 30px;">
+            """)
+
+HTML_GROUP_OPEN = Template("""
+                                    <h4 style="margin: 20px 0 12px 0; color: #4a5568; font-size: 16px; font-weight: 600;">$index</h4>
+                                    <table width="100%" style="border-collapse: collapse; margin-bottom: 10px;">
+                                        <thead>
+                                            <tr style="background-color: #f8fafc; border-bottom: 2px solid #edf2f7;">
+                                                <th align="left" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">基金名称</th>
+                                                <th align="center" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">当前状态</th>
+                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">今日限额</th>
+                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">较昨日变化</th>
+                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">溢价率</th>$extra_th
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                """)
+
+HTML_ROW = Template("""
+                                            <tr style="border-bottom: 1px solid #edf2f7;">
+                                                <td style="padding: 14px 8px; font-size: 14px;"><strong>$name</strong> <br><span style="color: #a0aec0; font-size: 12px;">$code</span></td>
+                                                <td align="center" style="padding: 14px 8px; font-size: 14px; $status_style">$status$stale_html</td>
+                                                <td align="right" style="padding: 14px 8px; font-size: 14px; font-weight: 600; color: #2d3748;">$disp_limit</td>
+                                                <td align="right" style="padding: 14px 8px; font-size: 14px;">$change_html</td>
+                                                <td align="right" style="padding: 14px 8px; font-size: 14px; $pr_style">$pr_display</td>$extra_td
+                                            </tr>
+                    """)
+
+HTML_GROUP_CLOSE = "                                        </tbody></table>"
+HTML_SECTION_CLOSE = "                                </td></tr>"
+
+HTML_FOOTER = """
+                            <!-- Footer -->
+                            <tr>
+                                <td style="padding: 30px; background-color: #f8fafc; border-top: 1px solid #edf2f7; color: #a0aec0; font-size: 12px; text-align: center;">
+                                    <p style="margin: 0 0 5px 0;">此邮件由 <strong>Fund Limit Monitor</strong> 自动发送</p>
+                                    <p style="margin: 0;">数据源: 集思录 / 天天基金网 | 仅供个人参考</p>
+                                </td>
+                            </tr>
+                        </table>
+                    </td>
+                </tr>
+            </table>
+        </body>
+        </html>
+        """
+
+STATUS_STYLE_OK = "color: #38a169; font-weight: 600;"
+STATUS_STYLE_PAUSED = "color: #e53e3e; font-weight: 600;"
+NOTE_TH = """
+                                                <th align="right" style="padding: 12px 8px; font-size: 13px; color: #718096; text-transform: uppercase;">近况</th>"""
+NOTE_TD = Template("""
+                                                <td align="right" style="padding: 14px 8px; font-size: 12px; color: #718096;">$note</td>""")
+STALE_HTML = Template('<br><span style="color: #a0aec0; font-size: 11px; font-weight: normal;">沿用 $as_of</span>')
+CHANGE_NONE = '<span style="color: #a0aec0;">-</span>'
+CHANGE_UP = Template('<span style="color: #38a169; font-weight: bold;">↑ $text</span>')
+CHANGE_DOWN = Template('<span style="color: #e53e3e; font-weight: bold;">↓ $text</span>')
+
+
+def render_html_row(row, show_notes=False):
+    """Render one table row of the HTML report."""
+    if row['direction'] == "up":
+        change_html = CHANGE_UP.substitute(text=row['change_text'])
+    elif row['direction'] == "down":
+        change_html = CHANGE_DOWN.substitute(text=row['change_text'])
+    else:
+        change_html = CHANGE_NONE
+
+    # Premium Rate Styling
+    premium_rate = row['premium_rate']
+    if premium_rate is not None:
+        if premium_rate > 1:
+            pr_style = "color: #e53e3e; font-weight: 600;"
+        elif premium_rate < 0:
+            pr_style = "color: #38a169; font-weight: 600;"
+        else:
+            pr_style = "color: #2d3748; font-weight: 600;"
+        pr_display = f"{premium_rate:.2f}%"
+    else:
+        pr_style = "color: #a0aec0;"
+        pr_display = "N/A"
+
+    return HTML_ROW.substitute(
+        name=row['name'],
+        code=row['code'],
+        status=row['status'],
+        status_style=STATUS_STYLE_PAUSED if row['paused'] else STATUS_STYLE_OK,
+        stale_html=STALE_HTML.substitute(as_of=row['stale_as_of']) if row['stale_as_of'] else "",
+        disp_limit=row['disp_limit'],
+        change_html=change_html,
+        pr_style=pr_style,
+        pr_display=pr_display,
+        extra_td=NOTE_TD.substitute(note=row['note'] or "-") if show_notes else "",
+    )
+
+
+def filter_model(model, predicate):
+    """Return a view of model keeping only rows for which predicate(row) is true.
+
+    Rows are shared with the original model, not copied.
+    """
+    sections = []
+    for section in model['sections']:
+        groups = []
+        for group in section['groups']:
+            rows = [row for row in group['rows'] if predicate(row)]
+            if rows:
+                groups.append({"index": group['index'], "rows": rows})
+        if groups:
+            sections.append({"title": section['title'], "groups": groups})
+    return dict(model, sections=sections)
+
+
+def render_html(model, out, fragments=None):
+    """Write the HTML email report for model to the file-like out.
+
+    fragments optionally caches rendered rows by code, so several filtered
+    views of one model render each row only once.
+    """
+    write = out.write
+    write(HTML_HEADER.substitute(now_time=model['generated_at']))
+    for section in model['sections']:
+        title = section['title']
+        write(HTML_SECTION_OPEN.substitute(title=title, color="#38a169" if title == "可申购" else "#e53e3e"))
+        for group in section['groups']:
+            write(HTML_GROUP_OPEN.substitute(index=group['index'], extra_th=NOTE_TH if model['show_notes'] else ""))
+            for row in group['rows']:
+                if fragments is None:
+                    write(render_html_row(row, model['show_notes']))
+                    continue
+                fragment = fragments.get(row['code'])
+                if fragment is None:
+                    fragment = fragments[row['code']] = render_html_row(row, model['show_notes'])
+                write(fragment)
+            write(HTML_GROUP_CLOSE)
+        write(HTML_SECTION_CLOSE)
+    write(HTML_FOOTER)
@@ -0,0 +1,71 @@
+import datetime
+
+from records import Status
+
+
+class IncrementalScheduler:
+    """Decides which funds need a fresh per-fund fetch in incremental mode.
+
+    Funds with a finite limit, paused, unknown, or recently changed status
+    are always refreshed. Funds that have been unlimited and unchanged for
+    stable_days are only re-fetched once their last fresh fetch is older than
+    max_stale_days (overridable per fund with "max_stale_days" in the funds
+    list); until then their previous values are reused and marked stale.
+    """
+
+    def __init__(self, store, stable_days=5, max_stale_days=3, today=None):
+        self.store = store
+        self.stable_days = stable_days
+        self.max_stale_days = max_stale_days
+        self.today = today or datetime.date.today()
+        self._state = None
+
+    def _load_state(self, codes):
+        """Summarize recent history per code: latest value, stable-since, last fresh fetch."""
+        lookback = max(self.stable_days, self.max_stale_days) * 3 + 7
+        since = (self.today - datetime.timedelta(days=lookback)).isoformat()
+        state = {}
+        for code, run_date, obs, stale in self.store.recent_observations(since):
+            if code not in codes:
+                continue
+            entry = state.get(code)
+            value = (obs['status'], obs['limit_val'])
+            if entry is None or entry['value'] != value:
+                entry = {"value": value, "stable_since": run_date, "last_fresh": None}
+                state[code] = entry
+            entry['obs'] = obs
+            if not stale:
+                entry['last_fresh'] = run_date
+        return state
+
+    def _days_since(self, date_str):
+        return (self.today - datetime.date.fromisoformat(date_str)).days
+
+    def plan(self, funds):
+        """Split funds into (to_fetch, reused) where reused maps code -> stale info fields."""
+        state = self._load_state({f['code'] for f in funds})
+        to_fetch = []
+        reused = {}
+        for fund in funds:
+            entry = state.get(fund['code'])
+            if entry is None or entry['last_fresh'] is None:
+                to_fetch.append(fund)
+                continue
+
+            obs = entry['obs']
+            unlimited = Status.of(obs['status'], obs['limit_val']) is Status.OPEN
+            stable = unlimited and self._days_since(entry['stable_since']) >= self.stable_days
+            max_stale = fund.get('max_stale_days', self.max_stale_days)
+            if not stable or self._days_since(entry['last_fresh']) >= max_stale:
+                to_fetch.append(fund)
+                continue
+
+            reused[fund['code']] = {
+                "status": obs['status'],
+                "limit_text": "None",
+                "limit_val": obs['limit_val'],
+                "premium_rate": obs['premium_rate'],
+                "stale": True,
+                "as_of": entry['last_fresh'],
+            }
+        return to_fetch, reused
@@ -0,0 +1,104 @@
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+# Seconds the parent waits past the run deadline for shards to report back
+SHARD_GRACE = 10
+
+
+def shard_of(code, shards):
+    """Stable shard number for a fund code, so each fund keeps its shard's page cache."""
+    return zlib.crc32(code.encode('utf-8')) % shards
+
+
+def split_shards(funds, shards):
+    """Split funds into shards lists, keeping each shard in the order given."""
+    buckets = [[] for _ in range(shards)]
+    for fund in funds:
+        buckets[shard_of(fund['code'], shards)].append(fund)
+    return buckets
+
+
+def _fetch_shard(index, shards, funds, use_cache, remaining=None):
+    """Worker process entry point: per-fund fetches for one shard.
+
+    remaining is the seconds left until the parent's run deadline.
+    """
+    from monitor import FundMonitor
+
+    monitor = FundMonitor(use_cache=use_cache, shard=(index, shards))
+    deadline = time.monotonic() + remaining if remaining is not None else None
+    monitor.pipeline.deadline = monitor.http.deadline = deadline
+    try:
+        results = monitor.pipeline.fetch_per_fund(funds)
+    finally:
+        monitor.http.close()
+    return results, monitor.pipeline.stats, list(monitor.telemetry.spans), monitor.telemetry.totals
+
+
+def _abandon(executor):
+    """Shut executor down without waiting and terminate its shard processes.
+
+    ProcessPoolExecutor joins its workers at interpreter exit, and a shard
+    whose fetches were abandoned at the deadline only exits once its worker
+    threads finish, so leaving them running would hold the process open.
+    """
+    processes = list((executor._processes or {}).values())  # no public accessor before Python 3.14
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class ShardedFetcher:
+    """Spreads the per-fund fetch stage over worker processes.
+
+    Used as SourcePipeline.run's fetch_pending. Funds are assigned to shards
+    by a hash of their code, and each shard runs in its own process with its
+    own thread pool, connection pool, page cache directory and an equal share
+    of the per-host rate limit. Results, source stats and telemetry are merged
+    back into the parent monitor, which builds the one report and history
+    append.
+    """
+
+    def __init__(self, monitor, shards):
+        self.monitor = monitor
+        self.shards = shards
+
+    def __call__(self, funds):
+        buckets = split_shards(funds, self.shards)
+        results = {}
+        deadline = self.monitor.pipeline.deadline
+        executor = ProcessPoolExecutor(max_workers=max(1, min(self.shards, os.cpu_count() or 1)))
+        futures = [
+            executor.submit(_fetch_shard, index, self.shards, bucket, self.monitor.use_cache,
+                            None if deadline is None else deadline - time.monotonic())
+            for index, bucket in enumerate(buckets) if bucket
+        ]
+        pending = set(futures)
+        try:
+            while pending:
+                # Shards stop on the deadline themselves; the grace covers requests in flight
+                timeout = None if deadline is None else max(0.0, deadline + SHARD_GRACE - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        shard_results, stats, spans, totals = future.result()
+                    except Exception as e:
+                        print(f"Shard failed: {e}")
+                        continue
+                    results.update(shard_results)
+                    self.monitor.pipeline.merge_stats(stats)
+                    self.monitor.telemetry.merge(spans, totals)
+                if pending and not done:
+                    print(f"Run deadline reached: abandoning {len(pending)} shard(s).")
+                    break
+        finally:
+            if pending or (deadline is not None and time.monotonic() >= deadline):
+                _abandon(executor)
+            else:
+                executor.shutdown()
+        print(f"Sharded fetch: {len(results)}/{len(funds)} funds from {len(futures)} shard process(es).")
+        return results
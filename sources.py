@@ -0,0 +1,429 @@
+import datetime
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from breaker import CircuitBreaker
+from classify import exchange_traded
+from records import limit_text_of
+
+# Registry of available data sources, keyed by source name
+SOURCE_REGISTRY = {}
+
+# Returned by PerFundSource.fetch_one when the source answered but has no such fund
+NOT_FOUND = object()
+
+
+def register_source(cls):
+    """Class decorator adding a FundSource subclass to the registry."""
+    SOURCE_REGISTRY[cls.name] = cls
+    return cls
+
+
+class FundSource:
+    """Base class for a fund data source.
+
+    A source returns info fields (status, limit_text, limit_val and optionally
+    name/premium_rate) for the codes it covers. cost is a relative per-call
+    weight: within each kind, cheaper sources are tried first.
+    """
+
+    name = None
+    bulk = False
+    cost = 1.0
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+
+class BulkSource(FundSource):
+    """A source that covers many funds with one (or a few) requests."""
+
+    bulk = True
+
+    def covers(self, code):
+        """Whether code has nowhere better to go than history when this source fails.
+
+        Codes a failed source covers use their last known good values instead
+        of falling through to the per-fund sources; by default none do.
+        """
+        return False
+
+    def fetch_raw(self, codes):
+        """Fetch the raw bulk dataset. codes is the set still uncovered.
+
+        Returns (raw, partial); partial is true when part of the dataset
+        failed to load, so covered codes missing from raw are not reliable.
+        """
+        raise NotImplementedError
+
+    def extract(self, raw, code):
+        """Return info fields for code from the raw dataset, or None."""
+        raise NotImplementedError
+
+
+class PerFundSource(FundSource):
+    """A source that needs one request per fund."""
+
+    def fetch_one(self, code, name):
+        """Return info fields for a single fund, None on failure, or NOT_FOUND
+        when the source has no data for the fund (not held against its breaker).
+        """
+        raise NotImplementedError
+
+
+@register_source
+class JisiluSource(BulkSource):
+    """Jisilu (集思录) QDII list: exchange-traded funds with premium rates."""
+
+    name = 'jisilu'
+    cost = 1.0
+
+    def covers(self, code):
+        return exchange_traded(code)
+
+    def fetch_raw(self, codes):
+        raw, failed = self.monitor.fetch_jisilu_lists()
+        return raw, bool(failed)
+
+    def extract(self, raw, code):
+        jsl = raw.get(code)
+        if jsl is None:
+            return None
+
+        apply_status = jsl["apply_status"]
+        fields = {"premium_rate": jsl["premium_rate"]}
+
+        if "暂停" in apply_status:
+            fields.update(status="暂停申购", limit_text="None", limit_val=-1)
+        elif apply_status == "开放申购":
+            fields.update(status="开放申购", limit_text="None", limit_val=float('inf'))
+        else:
+            # "限10", "限1000" etc.
+            fields["status"] = apply_status
+            limit_match = re.search(r"限(\d+(?:\.\d+)?)", apply_status)
+            if limit_match:
+                fields["limit_text"] = f"{limit_match.group(1)}元"
+                fields["limit_val"] = int(float(limit_match.group(1)))
+            else:
+                fields["limit_text"] = apply_status
+                fields["limit_val"] = 0
+
+        # Use Jisilu's fund name if shorter/better
+        if jsl.get("fund_nm"):
+            fields["name"] = jsl["fund_nm"]
+
+        print(f"  [Jisilu] {code} {jsl.get('fund_nm', '')}: {apply_status}, 溢价率={jsl['discount_rt_str']}")
+        return fields
+
+
+@register_source
+class EastMoneyBulkSource(BulkSource):
+    """EastMoney paged purchase-status feed covering OTC share classes."""
+
+    name = 'eastmoney_bulk'
+    cost = 5.0
+
+    def fetch_raw(self, codes):
+        return self.monitor.fetch_eastmoney_bulk_data(codes)
+
+    def extract(self, raw, code):
+        em = raw.get(code)
+        if em is None:
+            return None
+        print(f"  [EastMoney bulk] {code} {em['fund_nm']}: {em['status']} {em['limit_text']}")
+        return {"status": em["status"], "limit_text": em["limit_text"], "limit_val": em["limit_val"]}
+
+
+@register_source
+class EastMoneyPageSource(PerFundSource):
+    """EastMoney jbgk (基本概况) page scrape, one request per fund."""
+
+    name = 'eastmoney_page'
+    cost = 1.0
+
+    def fetch_one(self, code, name):
+        return self.monitor.fetch_eastmoney_page(code)
+
+
+class SourcePipeline:
+    """Runs registered sources in priority order and merges their results.
+
+    Bulk sources run first, cheapest first, each only asked for the codes
+    still uncovered. Whatever remains is dispatched to the per-fund sources
+    concurrently. The first source to cover a code wins. Per-source call
+    counts, hit counts and wall time are kept in stats.
+
+    Each source has a CircuitBreaker: after repeated failures it is skipped
+    until a half-open probe succeeds. Codes a failed bulk source covers (the
+    Jisilu ETFs), and codes no source could fetch, get their last known good
+    value from history, marked stale, instead of fanning out into per-fund
+    requests or showing as Unknown; other codes of a failed bulk source go
+    on to the per-fund sources. A run deadline stops new fetches once it
+    passes; whatever is complete by then is returned.
+    """
+
+    def __init__(self, monitor, source_names=None):
+        self.monitor = monitor
+        names = source_names or list(SOURCE_REGISTRY)
+        unknown = [n for n in names if n not in SOURCE_REGISTRY]
+        if unknown:
+            print(f"Warning: ignoring unknown data source(s): {', '.join(unknown)}")
+        sources = [SOURCE_REGISTRY[n](monitor) for n in names if n in SOURCE_REGISTRY]
+        self.bulk_sources = sorted((s for s in sources if s.bulk), key=lambda s: s.cost)
+        self.fund_sources = sorted((s for s in sources if not s.bulk), key=lambda s: s.cost)
+
+        config = monitor.config
+        self.breakers = {
+            s.name: CircuitBreaker(
+                s.name,
+                failure_threshold=int(config.get('breaker_failure_threshold', 5)),
+                reset_timeout=float(config.get('breaker_reset_seconds', 60)),
+            )
+            for s in sources
+        }
+        # Oldest last-known-good value worth showing, in days (0 disables the fallback)
+        self.fallback_max_age_days = int(config.get('fallback_max_age_days', 7))
+        self.deadline = None  # time.monotonic() value, set for the duration of run()
+        self._deadline_lock = threading.Lock()
+        self._abandoned = set()  # per-fund fetches left in flight at the deadline
+
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {s.name: {"calls": 0, "hits": 0, "seconds": 0.0, "skipped": 0}
+                      for s in self.bulk_sources + self.fund_sources}
+        self.stats['history'] = {"calls": 0, "hits": 0, "seconds": 0.0, "skipped": 0}
+
+    def _record(self, source, seconds, hits):
+        with self._stats_lock:
+            entry = self.stats[source.name]
+            entry["calls"] += 1
+            entry["hits"] += hits
+            entry["seconds"] += seconds
+
+    def _skip(self, source):
+        with self._stats_lock:
+            self.stats[source.name]["skipped"] += 1
+
+    def _past_deadline(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _fetch_residual(self, fund):
+        with self.monitor.telemetry.span("fetch.fund", code=fund['code'], source=None) as span:
+            for source in self.fund_sources:
+                if self._past_deadline():
+                    break
+                breaker = self.breakers[source.name]
+                if not breaker.allow():
+                    self._skip(source)
+                    continue
+                start = time.perf_counter()
+                fields = source.fetch_one(fund['code'], fund['name'])
+                if fields is NOT_FOUND:
+                    # The source is up, it just doesn't list this fund
+                    self._record(source, time.perf_counter() - start, 0)
+                    breaker.record_success()
+                    continue
+                self._record(source, time.perf_counter() - start, 1 if fields else 0)
+                if fields:
+                    breaker.record_success()
+                    span["attrs"]["source"] = source.name
+                    return fields, source.name
+                breaker.record_failure()
+        return None, None
+
+    def fetch_per_fund(self, funds):
+        """Run the per-fund sources for funds on a thread pool.
+
+        Returns {code: (fields, source name)} for the funds some source
+        covered. Funds not started by the run deadline are cancelled, and
+        fetches still in flight then are abandoned.
+        """
+        results = {}
+        workers = max(1, min(self.monitor.fetch_workers, len(funds)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(self._fetch_residual, fund): fund for fund in funds}
+        pending = set(futures)
+        try:
+            while pending:
+                timeout = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    fields, source_name = future.result()
+                    if fields:
+                        results[futures[future]['code']] = (fields, source_name)
+                if pending and self._past_deadline():
+                    cancelled = sum(future.cancel() for future in pending)
+                    print(f"Run deadline reached: {cancelled} fetch(es) cancelled, "
+                          f"{len(pending) - cancelled} abandoned in flight.")
+                    self._abandoned.update(f for f in pending if not f.cancelled())
+                    break
+        finally:
+            executor.shutdown(wait=not pending, cancel_futures=True)
+        return results
+
+    def _set_deadline(self, deadline):
+        with self._deadline_lock:
+            self.deadline = deadline
+            self.monitor.http.deadline = deadline
+
+    def _clear_deadline(self, deadline):
+        """Clear deadline unless a later run has set its own meanwhile."""
+        with self._deadline_lock:
+            if self.deadline == deadline:
+                self.deadline = None
+            if self.monitor.http.deadline == deadline:
+                self.monitor.http.deadline = None
+
+    def _release_deadline(self, deadline):
+        """Clear the run deadline once no fetch abandoned in flight still needs it.
+
+        Abandoned fetches keep running on their worker threads; with the
+        deadline cleared under them they would go back to retrying with full
+        backoff and keep the process alive past the deadline.
+        """
+        abandoned, self._abandoned = self._abandoned, set()
+        if not abandoned:
+            self._clear_deadline(deadline)
+            return
+
+        def clear_when_drained():
+            wait(abandoned)
+            self._clear_deadline(deadline)
+
+        threading.Thread(target=clear_when_drained, name="deadline-release", daemon=True).start()
+
+    def merge_stats(self, stats):
+        """Add per-source stats gathered elsewhere (e.g. in a shard process)."""
+        with self._stats_lock:
+            for name, entry in stats.items():
+                total = self.stats.setdefault(name, {})
+                for key, value in entry.items():
+                    total[key] = total.get(key, 0) + value
+
+    def fallback(self, codes):
+        """Last known good fields from history for codes, marked stale."""
+        if not codes or self.fallback_max_age_days <= 0:
+            return {}
+        since = (datetime.date.today() - datetime.timedelta(days=self.fallback_max_age_days)).isoformat()
+        start = time.perf_counter()
+        try:
+            known = self.monitor.history_store.last_known_good(codes, since)
+        except Exception as e:
+            print(f"History fallback failed: {e}")
+            return {}
+        fallbacks = {}
+        for code, (run_date, obs) in known.items():
+            fallbacks[code] = ({
+                "status": obs['status'],
+                "limit_text": limit_text_of(obs['limit_val']),
+                "limit_val": obs['limit_val'],
+                "premium_rate": obs['premium_rate'],
+                "stale": True,
+                "as_of": run_date,
+            }, 'history')
+        with self._stats_lock:
+            entry = self.stats['history']
+            entry["calls"] += 1
+            entry["hits"] += len(fallbacks)
+            entry["seconds"] += time.perf_counter() - start
+        return fallbacks
+
+    def run(self, funds, prefetched=None, run_bulk=True, scheduler=None, fetch_pending=None, deadline=None):
+        """Fetch info for funds, returning FundRecords in the order given.
+
+        prefetched maps a bulk source name to raw data already fetched for it;
+        with run_bulk=False, bulk sources without prefetched data are skipped.
+        scheduler (an IncrementalScheduler) may withhold funds from the
+        per-fund sources and supply their previous values instead.
+        fetch_pending replaces fetch_per_fund for the funds left after the
+        bulk sources (used to spread them over shard processes).
+        deadline is a time.monotonic() value after which no new fetch starts.
+        """
+        prefetched = prefetched or {}
+        results = {}
+        residual = list(dict.fromkeys(f['code'] for f in funds))
+        self._set_deadline(deadline)
+        try:
+            degraded = set()  # codes covered by a bulk source that failed
+            for source in self.bulk_sources:
+                if not residual:
+                    break
+                if source.name in prefetched:
+                    raw = prefetched[source.name]
+                elif not run_bulk:
+                    continue
+                elif self._past_deadline() or not self.breakers[source.name].allow():
+                    self._skip(source)
+                    degraded.update(c for c in residual if source.covers(c))
+                    continue
+                else:
+                    start = time.perf_counter()
+                    with self.monitor.telemetry.span(f"fetch.{source.name}", funds=len(residual)):
+                        raw, partial = source.fetch_raw(residual)
+                    self._record(source, time.perf_counter() - start, 0)
+                    if raw and not partial:
+                        self.breakers[source.name].record_success()
+                    else:
+                        # Covered codes missing from a partial dataset may be in the part that failed
+                        self.breakers[source.name].record_failure()
+                        degraded.update(c for c in residual if source.covers(c))
+                if not raw:
+                    continue
+
+                hits = 0
+                for code in residual:
+                    fields = source.extract(raw, code)
+                    if fields:
+                        results[code] = (fields, source.name)
+                        hits += 1
+                with self._stats_lock:
+                    self.stats[source.name]["hits"] += hits
+                residual = [c for c in residual if c not in results]
+
+            # A failed bulk feed should not turn into one page request per fund
+            fallbacks = self.fallback([c for c in residual if c in degraded])
+            if fallbacks:
+                results.update(fallbacks)
+                print(f"Bulk source failure: {len(fallbacks)} fund(s) use last known good values from history.")
+
+            residual_set = {c for c in residual if c not in results}
+            pending = list({f['code']: f for f in funds if f['code'] in residual_set}.values())
+            if pending and scheduler is not None:
+                pending, reused = scheduler.plan(pending)
+                for code, fields in reused.items():
+                    results[code] = (fields, 'history')
+                if reused:
+                    print(f"Incremental: reusing {len(reused)} stable fund(s), fetching {len(pending)}.")
+            if pending and self.fund_sources and not self._past_deadline():
+                results.update((fetch_pending or self.fetch_per_fund)(pending))
+
+            missing = [f['code'] for f in pending if f['code'] not in results]
+            fallbacks = self.fallback(missing)
+            if fallbacks:
+                results.update(fallbacks)
+                print(f"{len(fallbacks)} of {len(missing)} unfetched fund(s) use last known good values from history.")
+        finally:
+            self._release_deadline(deadline)
+
+        funds_data = []
+        for fund in funds:
+            info = self.monitor.new_fund_info(fund['code'], fund['name'])
+            fields, source_name = results.get(fund['code'], (None, None))
+            if fields:
+                info.update(fields, source=source_name)
+            funds_data.append(info)
+        return funds_data
+
+    def print_stats(self):
+        for name, entry in self.stats.items():
+            if name == 'history' and not entry['calls']:
+                continue
+            line = f"Source {name}: {entry['calls']} call(s), {entry['hits']} hit(s), {entry['seconds']:.2f}s"
+            if entry.get('skipped'):
+                line += f", {entry['skipped']} skipped (circuit open or past deadline)"
+            print(line)
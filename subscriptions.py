@@ -0,0 +1,96 @@
+import io
+import json
+
+from report import filter_model, render_html, render_markdown
+
+
+class Subscription:
+    """One recipient's watchlist and thresholds.
+
+    All filters are optional and combine with AND:
+      codes            only these fund codes
+      index_types      e.g. ["纳斯达克100"] (report grouping names)
+      share_classes    e.g. ["A"]
+      keywords         substrings of the full fund name
+      min_limit        daily limit in yuan; unlimited passes, paused never does
+      purchasable_only skip the 不可申购 section
+    """
+
+    def __init__(self, email, name=None, codes=None, index_types=None, share_classes=None,
+                 keywords=None, min_limit=None, purchasable_only=False):
+        self.email = email
+        self.name = name or email
+        self.codes = set(codes) if codes else None
+        self.index_types = set(index_types) if index_types else None
+        self.share_classes = set(share_classes) if share_classes else None
+        self.keywords = list(keywords) if keywords else None
+        self.min_limit = float(min_limit) if min_limit is not None else None
+        self.purchasable_only = purchasable_only
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['email'],
+            name=data.get('name'),
+            codes=data.get('codes'),
+            index_types=data.get('index_types'),
+            share_classes=data.get('share_classes'),
+            keywords=data.get('keywords'),
+            min_limit=data.get('min_limit'),
+            purchasable_only=bool(data.get('purchasable_only')),
+        )
+
+    def matches(self, row):
+        if self.codes is not None and row['code'] not in self.codes:
+            return False
+        if self.index_types is not None and row['index_type'] not in self.index_types:
+            return False
+        if self.share_classes is not None and row['share_class'] not in self.share_classes:
+            return False
+        if self.keywords is not None and not any(k in row['full_name'] for k in self.keywords):
+            return False
+        if self.min_limit is not None and row['limit_val'] < self.min_limit:
+            return False
+        if self.purchasable_only and row['category'] != "可申购":
+            return False
+        return True
+
+
+def load_subscriptions(raw):
+    """Build Subscriptions from a list of dicts or a JSON string of one.
+
+    Invalid entries are reported and skipped.
+    """
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError as e:
+            print(f"Error parsing subscriptions: {e}")
+            return []
+    subscriptions = []
+    for entry in raw:
+        try:
+            subscriptions.append(Subscription.from_dict(entry))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping invalid subscription {entry!r}: {e}")
+    return subscriptions
+
+
+def render_digests(model, subscriptions):
+    """Render every subscriber's digest from one report model.
+
+    Yields (subscription, markdown, html) for subscribers with at least one
+    matching fund. Each HTML row is rendered once and shared by all digests.
+    """
+    fragments = {}
+    for sub in subscriptions:
+        view = filter_model(model, sub.matches)
+        if not view['sections']:
+            print(f"No funds match subscription of {sub.name}; skipping digest.")
+            continue
+        text, html = io.StringIO(), io.StringIO()
+        render_markdown(view, text)
+        render_html(view, html, fragments)
+        yield sub, text.getvalue(), html.getvalue()
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class RunTelemetry:
+    """Timing spans and counters for one monitor run.
+
+    span() times a stage; spans nest per thread, so counters added with
+    add() (HTTP requests, retries, bytes downloaded, cache hits) are charged
+    to the innermost open span of the calling thread, e.g. the fund being
+    fetched by that worker. summary() aggregates everything into a
+    JSON-serializable dict. Only the last max_spans spans are kept, so
+    long watch sessions stay bounded.
+    """
+
+    COUNTERS = ("requests", "retries", "bytes", "cache_hits")
+
+    def __init__(self, max_spans=50000):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = deque(maxlen=max_spans)
+        self.totals = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block as a span called name, tagged with attrs."""
+        record = {"name": name, "attrs": attrs, "counters": dict.fromkeys(self.COUNTERS, 0)}
+        stack = self._stack()
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["start"] = round(start - self._start, 4)
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            stack.pop()
+            # Nested spans roll their counters up into the enclosing span
+            if stack:
+                for key, value in record["counters"].items():
+                    stack[-1]["counters"][key] += value
+            with self._lock:
+                self.spans.append(record)
+
+    def add(self, **counters):
+        """Add to counters of the current thread's innermost span and the run totals."""
+        stack = self._stack()
+        with self._lock:
+            for key, value in counters.items():
+                self.totals[key] += value
+        if stack:
+            for key, value in counters.items():
+                stack[-1]["counters"][key] += value
+
+    def merge(self, spans, totals):
+        """Fold in spans and totals recorded by another process (e.g. a shard worker)."""
+        with self._lock:
+            self.spans.extend(spans)
+            for key, value in totals.items():
+                self.totals[key] += value
+
+    def summary(self, top=10):
+        """Aggregate spans into per-stage totals, per-fund rows and the slowest funds."""
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for record in spans:
+            stage = stages.setdefault(record["name"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] = round(stage["seconds"] + record["seconds"], 4)
+            stage["max_seconds"] = max(stage["max_seconds"], record["seconds"])
+
+        funds = [dict(record["attrs"], seconds=record["seconds"], **record["counters"])
+                 for record in spans if record["name"] == "fetch.fund"]
+        slowest = sorted(funds, key=lambda f: f["seconds"], reverse=True)[:top]
+        return {
+            "started_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            "total_seconds": round(time.perf_counter() - self._start, 4),
+            "totals": dict(self.totals),
+            "stages": stages,
+            "slowest_funds": slowest,
+            "funds": funds,
+        }
+
+    def write_summary(self, path, extra=None):
+        summary = self.summary()
+        if extra:
+            summary.update(extra)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            print(f"Run summary written to {path}.")
+        except OSError as e:
+            print(f"Error writing run summary {path}: {e}")
+        return summary
+
+    def print_summary(self, top=5):
+        summary = self.summary(top)
+        print(f"Run took {summary['total_seconds']:.2f}s "
+              f"({summary['totals']['requests']} request(s), {summary['totals']['retries']} retr(ies), "
+              f"{summary['totals']['bytes'] / 1024:.0f} KB)")
+        for name, stage in summary["stages"].items():
+            print(f"  {name}: {stage['count']}x, {stage['seconds']:.2f}s total, {stage['max_seconds']:.2f}s max")
+        for fund in summary["slowest_funds"]:
+            if fund["seconds"] > 0:
+                print(f"  slow fund {fund.get('code')}: {fund['seconds']:.2f}s via {fund.get('source')}, "
+                      f"{fund['retries']} retr(ies)")
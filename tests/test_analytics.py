@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from analytics import compute_quota_analytics, summarize
+
+
+def _matrix(rows, dates):
+    return pd.DataFrame(rows, index=pd.to_datetime(dates), columns=['000001', '000002'], dtype=float)
+
+
+def test_single_run():
+    # e.g. right after importing the legacy history.json
+    result = compute_quota_analytics(_matrix([[-1, 1000]], ['2026-01-05']))
+    assert list(result.index) == ['000001', '000002']
+    assert result['last_reopen'].isna().all()
+    assert result.loc['000001', 'days_since_pause'] == 0
+    assert np.isnan(result.loc['000001', 'rolling_min'])
+    assert result.loc['000002', 'rolling_min'] == 1000
+    assert (result['changes'] == 0).all()
+    assert result['change_rate'].isna().all()
+    summarize(result)
+
+
+def test_no_runs():
+    result = compute_quota_analytics(_matrix(np.empty((0, 2)), []))
+    assert list(result.index) == ['000001', '000002']
+    assert summarize(result) == {'000001': '', '000002': ''}
+
+
+def test_reopen_after_pause():
+    result = compute_quota_analytics(_matrix([[-1, 1000], [500, 1000]], ['2026-01-05', '2026-01-06']))
+    assert result.loc['000001', 'last_reopen'] == pd.Timestamp('2026-01-06')
+    assert pd.isna(result.loc['000002', 'last_reopen'])
+    assert result.loc['000001', 'days_since_pause'] == 1
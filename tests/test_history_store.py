@@ -0,0 +1,40 @@
+import numpy as np
+
+from analytics import load_limit_matrix
+from history_store import HistoryStore
+
+
+def _fund(code, limit_val=1000):
+    return {"code": code, "status": "限大额", "limit_val": limit_val}
+
+
+def _compacted_store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    # 000003 drops out of the fund list after the 2nd run and comes back for the 5th
+    for day, codes in enumerate([['000001', '000002', '000003'], ['000001', '000002', '000003'],
+                                 ['000001', '000002'], ['000001', '000002'],
+                                 ['000001', '000002', '000003']], start=5):
+        store.append_run([_fund(c, 500 if c == '000002' and day == 8 else 1000) for c in codes],
+                         f"2025-01-{day:02d}")
+    assert store.compact(keep_days=0) == ['2025-01']
+    return store
+
+
+def test_snapshot_of_compacted_month_keeps_run_members(tmp_path):
+    store = _compacted_store(tmp_path)
+    assert sorted(store.snapshot(2)) == ['000001', '000002', '000003']
+    snapshot = store.snapshot(4)
+    assert sorted(snapshot) == ['000001', '000002']
+    assert snapshot['000001']['limit_val'] == 1000  # forward-filled
+    assert snapshot['000002']['limit_val'] == 500
+    assert sorted(store.snapshot(5)) == ['000001', '000002', '000003']
+
+
+def test_series_and_matrix_of_compacted_month_skip_absent_runs(tmp_path):
+    store = _compacted_store(tmp_path)
+    assert [d for d, _ in store.series('000003')] == ['2025-01-05', '2025-01-06', '2025-01-09']
+    assert len(store.series('000001')) == 5
+
+    matrix = load_limit_matrix(store)
+    assert np.isnan(matrix['000003'].to_numpy()[2:4]).all()
+    assert (matrix['000001'] == 1000).all()
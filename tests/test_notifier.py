@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from devtools.fake_notify import FakeSMTPServer, FakeWebhookServer, start_in_background
+from http_client import HttpClient
+from notifier import NotificationDispatcher, NotificationQueue, SmtpChannel, WebhookChannel
+
+
+@pytest.fixture
+def servers():
+    smtp = start_in_background(FakeSMTPServer(port=0))
+    webhook = start_in_background(FakeWebhookServer(port=0))
+    yield smtp, webhook
+    for server in (smtp, webhook):
+        server.shutdown()
+        server.server_close()
+
+
+def _dispatcher(servers, outbox):
+    smtp, webhook = servers
+    channels = [
+        SmtpChannel('127.0.0.1', smtp.server_address[1], 'bot', 'x', 'bot@test', starttls=False, timeout=5),
+        WebhookChannel(HttpClient(rate_limit=0), f"http://127.0.0.1:{webhook.server_address[1]}/send", timeout=5),
+    ]
+    # No backoff, so jobs requeued by a failed flush are due again straight away
+    return NotificationDispatcher(channels, NotificationQueue(str(outbox)), backoff_base=0)
+
+
+def test_failed_deliveries_stay_queued_then_drain(servers, tmp_path):
+    smtp, webhook = servers
+    outbox = tmp_path / '.outbox'
+    smtp.fail_rate = webhook.fail_rate = 1.0
+
+    dispatcher = _dispatcher(servers, outbox)
+    dispatcher.enqueue("日报", subject="基金申购限额日报", receivers=['a@test', 'b@test'])
+    assert dispatcher.flush() == {'email': 0, 'wechat': 0}
+    dispatcher.close()
+    assert len(os.listdir(outbox)) == 2
+    assert smtp.messages == [] and webhook.messages == []
+
+    # The next run picks the queue up from disk
+    smtp.fail_rate = webhook.fail_rate = 0.0
+    dispatcher = _dispatcher(servers, outbox)
+    assert dispatcher.flush() == {'email': 1, 'wechat': 1}
+    dispatcher.close()
+    assert os.listdir(outbox) == []
+    assert len(smtp.messages) == 1 and smtp.messages[0]['to'] == ['a@test', 'b@test']
+    assert webhook.messages[0]['markdown']['content'] == "日报"
+
+
+def test_jobs_past_max_attempts_are_dead_lettered(servers, tmp_path):
+    smtp, webhook = servers
+    outbox = tmp_path / '.outbox'
+    webhook.fail_rate = 1.0
+
+    dispatcher = _dispatcher(servers, outbox)
+    dispatcher.max_total_attempts = dispatcher.max_attempts
+    dispatcher.enqueue("日报", receivers=['a@test'])
+    assert dispatcher.flush() == {'email': 1, 'wechat': 0}
+    dispatcher.close()
+    assert sorted(os.listdir(outbox)) == ['failed']
+    assert len(os.listdir(outbox / 'failed')) == 1
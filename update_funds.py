@@ -1,58 +1,154 @@
-import akshare as ak
-import pandas as pd
+import argparse
 import json
 import os
+import re
 import time
 
+from classify import Classifier
+
 CONFIG_FILE = 'config.json'
+FUND_INDEX_FILE = 'fund_index.json'   # per-code classification, read by the monitor
+UNIVERSE_CACHE = 'fund_universe.npz'  # columnar cache of the raw ak.fund_name_em() table
+
+# Name keywords selecting the monitored funds (config "universe_keywords")
+DEFAULT_KEYWORDS = ["标普500", "纳斯达克", "纳指"]
+
+# ak.fund_name_em() columns kept in the cache: ['基金代码', '基金简称', '基金类型']
+UNIVERSE_COLUMNS = {"code": "基金代码", "name": "基金简称", "type": "基金类型"}
+
+
+def fetch_universe():
+    """Download the full EastMoney fund list via akshare, with retries."""
+    # akshare and pandas take seconds to import; only a download needs them
+    import akshare as ak
+    import pandas as pd
 
-def update_fund_list():
     print("Fetching fund list from EastMoney via akshare...")
     max_retries = 3
     retry_delay = 5
-    
-    df_funds = None
+
     for attempt in range(max_retries):
         try:
             # Fetch all fund names and codes
             df_funds = ak.fund_name_em()
-            break
+            return pd.DataFrame({col: df_funds[src].astype(str) for col, src in UNIVERSE_COLUMNS.items()})
         except Exception as e:
             print(f"Attempt {attempt + 1} failed: {e}")
             if attempt < max_retries - 1:
                 time.sleep(retry_delay)
-            else:
-                print("Failed to fetch fund list after all attempts.")
-                return False
+    print("Failed to fetch fund list after all attempts.")
+    return None
+
+
+def save_universe(df, path=UNIVERSE_CACHE):
+    import numpy as np
+
+    np.savez_compressed(
+        path,
+        fetched_at=np.array(time.time()),
+        **{col: df[col].to_numpy(dtype=str) for col in UNIVERSE_COLUMNS},
+    )
+
+
+def load_universe(path=UNIVERSE_CACHE):
+    """Return (DataFrame, fetched_at) from the columnar cache, or (None, None)."""
+    if not os.path.exists(path):
+        return None, None
+    import numpy as np
+    import pandas as pd
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            df = pd.DataFrame({col: data[col] for col in UNIVERSE_COLUMNS})
+            return df, float(data['fetched_at'])
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None, None
+
+
+def get_universe(max_age_hours=20, refresh=False):
+    """Cached universe if younger than max_age_hours, else a fresh download.
+
+    A stale cache is still used when the download fails.
+    """
+    cached, fetched_at = load_universe()
+    if cached is not None and not refresh and time.time() - fetched_at < max_age_hours * 3600:
+        print(f"Using cached fund list ({len(cached)} funds) from {UNIVERSE_CACHE}.")
+        return cached
 
+    df = fetch_universe()
+    if df is not None and not df.empty:
+        save_universe(df)
+        return df
+    if cached is not None:
+        print(f"Falling back to stale cached fund list from {time.strftime('%Y-%m-%d', time.localtime(fetched_at))}.")
+    return cached
+
+
+def diff_funds(current, matched):
+    """Merge matched universe rows into the current funds list.
+
+    Entries marked "manual": true are always kept. Other entries not matched
+    any more are dropped, and matched codes not yet listed are added. Extra
+    per-fund keys (e.g. max_stale_days) are preserved and names are refreshed.
+    Repeated entries for a code are dropped, keeping the first.
+    Returns (funds, added, removed, renamed).
+    """
+    matched_names = dict(zip(matched['code'], matched['name']))
+    funds, removed, renamed = [], [], []
+    listed = set()
+    for entry in current:
+        code = entry.get('code')
+        if code in listed:
+            print(f"Warning: dropping duplicate entry for {code} {entry.get('name')}")
+            continue
+        if code in matched_names:
+            if entry.get('name') != matched_names[code]:
+                renamed.append((code, entry.get('name'), matched_names[code]))
+                entry = dict(entry, name=matched_names[code])
+        elif not entry.get('manual'):
+            removed.append(entry)
+            continue
+        funds.append(entry)
+        listed.add(code)
+
+    added = [{"code": code, "name": name} for code, name in matched_names.items() if code not in listed]
+    funds.extend(added)
+    funds.sort(key=lambda f: f['code'])
+    return funds, added, removed, renamed
+
+
+def build_fund_index(funds, classifier):
+    """Precomputed classification for every configured fund, keyed by code.
+
+    Tagged with the rules fingerprint so the monitor ignores it once the
+    classification rules change. A code listed more than once is indexed
+    under its first entry.
+    """
+    import pandas as pd
+
+    codes = pd.Series([f['code'] for f in funds], dtype=str)
+    names = pd.Series([f['name'] for f in funds], dtype=str)
+    duplicated = codes.duplicated().to_numpy()
+    if duplicated.any():
+        print(f"Warning: duplicate fund code(s) {', '.join(sorted(set(codes[duplicated])))}; "
+              "indexing the first entry of each.")
+        codes = codes[~duplicated].reset_index(drop=True)
+        names = names[~duplicated].reset_index(drop=True)
+    classes = classifier.classify_frame(codes, names)
+    classes.insert(0, "name", names)
+    classes.index = codes
+    return {"rules": classifier.fingerprint, "funds": classes.to_dict(orient='index')}
+
+
+def update_fund_list(max_age_hours=20, refresh=False, dry_run=False):
+    df_funds = get_universe(max_age_hours, refresh)
     if df_funds is None or df_funds.empty:
         print("Fetched data is empty.")
         return False
 
     print(f"Total funds found: {len(df_funds)}")
 
-    # Filter funds (Case-insensitive match for 标普500, 纳斯达克, 纳指)
-    # df_funds columns: ['基金代码', '拼音缩写', '基金简称', '基金类型', '拼音全称']
-    keywords = ["标普500", "纳斯达克", "纳指"]
-    pattern = '|'.join(keywords)
-    
-    # Filtering
-    filtered_df = df_funds[df_funds['基金简称'].str.contains(pattern, case=False, na=False)].copy()
-    
-    # Focus on A class funds (often names ending in A or not containing C/E etc.)
-    # However, let's keep all for now and provide a clean list.
-    # The user's original config had mostly A class, but the prompt says 
-    # "筛选出‘基金简称’中包含...的所有基金".
-    
-    new_funds = []
-    for _, row in filtered_df.iterrows():
-        new_funds.append({
-            "code": row['基金代码'],
-            "name": row['基金简称']
-        })
-    
-    print(f"Filtered funds count: {len(new_funds)}")
-
     # Load existing config or create default
     config = {"funds": []}
     if os.path.exists(CONFIG_FILE):
@@ -64,21 +160,51 @@ def update_fund_list():
     else:
         print(f"{CONFIG_FILE} not found. Creating a new one.")
 
+    # Filter funds (case-insensitive name keywords, optionally restricted to fund types such as "QDII")
+    keywords = config.get('universe_keywords', DEFAULT_KEYWORDS)
+    pattern = '|'.join(map(re.escape, keywords))
+    mask = df_funds['name'].str.contains(pattern, case=False, na=False, regex=True)
+    fund_types = config.get('universe_fund_types')
+    if fund_types:
+        mask &= df_funds['type'].str.contains('|'.join(map(re.escape, fund_types)), na=False, regex=True)
+    matched = df_funds[mask]
+    print(f"Filtered funds count: {len(matched)}")
+
+    funds, added, removed, renamed = diff_funds(config.get('funds', []), matched)
+    for entry in added:
+        print(f"  + {entry['code']} {entry['name']}")
+    for entry in removed:
+        print(f"  - {entry.get('code')} {entry.get('name')}")
+    for code, old, new in renamed:
+        print(f"  ~ {code} {old} -> {new}")
+    print(f"{len(added)} added, {len(removed)} removed, {len(renamed)} renamed.")
+    if dry_run:
+        return True
+
     # Update only the 'funds' field
-    config['funds'] = new_funds
-    
+    config['funds'] = funds
+    fund_index = build_fund_index(funds, Classifier(config.get('classification')))
+
     # Preserve formatting and save back
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=4)
-        print(f"Successfully updated {CONFIG_FILE} with {len(new_funds)} funds.")
+        with open(FUND_INDEX_FILE, 'w', encoding='utf-8') as f:
+            json.dump(fund_index, f, ensure_ascii=False, indent=1)
+        print(f"Successfully updated {CONFIG_FILE} with {len(funds)} funds.")
         return True
     except Exception as e:
         print(f"Error saving config: {e}")
         return False
 
 if __name__ == "__main__":
-    if update_fund_list():
+    parser = argparse.ArgumentParser(description="Refresh the monitored fund list")
+    parser.add_argument('--refresh', action='store_true', help="ignore the cached fund list and download it again")
+    parser.add_argument('--max-age', type=float, default=20, metavar='HOURS', help="reuse the cached fund list if younger than this")
+    parser.add_argument('--dry-run', action='store_true', help="only print the changes")
+    args = parser.parse_args()
+
+    if update_fund_list(args.max_age, args.refresh, args.dry_run):
         print("Update process completed successfully.")
     else:
         print("Update process failed.")
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections import deque
+
+from records import Status, format_limit
+from sources import JisiluSource
+
+
+class FundWatcher:
+    """Long-running intraday watch mode built on FundMonitor.
+
+    Polls the Jisilu bulk feed every bulk_interval seconds and the full source
+    pipeline every full_interval seconds. Each snapshot is diffed against the
+    previous in-memory state, and a notification goes out only when a fund
+    switches between purchasable and not, or its daily limit crosses
+    limit_threshold. Premium alert rules are evaluated on every poll, each
+    rule/fund pair firing at most once a day. Polls share one lock, so they
+    never overlap. Memory stays bounded: one entry per fund plus the last
+    max_events changes.
+    """
+
+    def __init__(self, monitor, bulk_interval=60, full_interval=600,
+                 limit_threshold=1000, until=None, max_events=200):
+        self.monitor = monitor
+        self.bulk_interval = bulk_interval
+        self.full_interval = full_interval
+        self.limit_threshold = limit_threshold
+        self.until = until  # "HH:MM" local time to stop, or None to run forever
+        self.state = {}  # code -> latest FundRecord
+        self.names = {f['code']: f['name'] for f in monitor.funds_config}
+        self.events = deque(maxlen=max_events)
+        self._jisilu = JisiluSource(monitor)
+        # Intraday polls must reach upstream: cached pages are only revalidated (ETag/304),
+        # never served as fresh, or OTC changes would go unseen for up to http_cache_ttl
+        if monitor.http.cache is not None:
+            monitor.http.cache.ttl = 0
+        self.alert_engine = monitor.alert_engine()
+        self._fired = set()  # (date, rule, code) already alerted
+
+    def diff(self, funds_data):
+        """Update state from funds_data and return the changes worth notifying."""
+        changes = []
+        for info in funds_data:
+            if info.state is Status.UNKNOWN:
+                continue
+            code = info.code
+            prev = self.state.get(code)
+            self.state[code] = info
+            if prev is None or (prev.status, prev.limit_val) == (info.status, info.limit_val):
+                continue
+
+            was_open, is_open = prev.purchasable, info.purchasable
+            crossed = (prev.limit_val >= self.limit_threshold) != (info.limit_val >= self.limit_threshold)
+            if was_open != is_open or (is_open and crossed):
+                change = {
+                    "time": time.strftime('%H:%M:%S'),
+                    "code": code,
+                    "name": info.name,
+                    "prev": prev,
+                    "curr": info,
+                }
+                changes.append(change)
+                self.events.append(change)
+        return changes
+
+    def _poll_bulk(self):
+        breaker = self.monitor.pipeline.breakers.get(JisiluSource.name)
+        if breaker is not None and not breaker.allow():
+            return []
+        raw, failed = self.monitor.fetch_jisilu_lists()
+        if breaker is not None:
+            if raw and not failed:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+        funds_data = []
+        for code in self.state:
+            fields = self._jisilu.extract(raw, code)
+            if fields:
+                info = self.monitor.new_fund_info(code, self.names.get(code, code))
+                info.update(fields)
+                funds_data.append(info)
+        return funds_data
+
+    def _poll_full(self):
+        # A full poll must not run into the next one
+        return self.monitor.pipeline.run(self.monitor.funds_config, deadline=time.monotonic() + self.full_interval)
+
+    def _format_limit(self, info):
+        return format_limit(info.limit_val) if info.limit_val != 0 else info.status
+
+    def _notify(self, changes):
+        lines = ["# 基金申购额度变动提醒", f"> 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}"]
+        for c in changes:
+            prev, curr = c['prev'], c['curr']
+            loosened = curr.purchasable and (not prev.purchasable or curr.limit_val > prev.limit_val)
+            arrow = "↑" if loosened else "↓"
+            lines.append(f"- {self.monitor._shorten_name(c['name'])}({c['code']}) "
+                         f"{self._format_limit(prev)} → {self._format_limit(curr)} {arrow}")
+        self.monitor.send_notification("\n".join(lines), subject='基金申购额度变动提醒')
+
+    def new_alerts(self, funds_data):
+        """Alerts for funds_data not yet sent today."""
+        if self.alert_engine is None:
+            return []
+        today = time.strftime('%Y-%m-%d')
+        fresh = []
+        for alert in self.alert_engine.evaluate(funds_data):
+            key = (today, alert['rule'], alert['code'])
+            if key not in self._fired:
+                self._fired.add(key)
+                fresh.append(alert)
+        # Keep only today's keys
+        self._fired = {key for key in self._fired if key[0] == today}
+        return fresh
+
+    def _past_until(self):
+        return self.until is not None and time.strftime('%H:%M') >= self.until
+
+    async def _poll_loop(self, name, poll, interval, lock):
+        await asyncio.sleep(interval)
+        while not self._past_until():
+            started = time.monotonic()
+            async with lock:
+                try:
+                    funds_data = await asyncio.to_thread(poll)
+                except Exception as e:
+                    print(f"Watch: {name} poll failed: {e}")
+                    funds_data = []
+                changes = self.diff(funds_data)
+                if changes:
+                    print(f"Watch: {len(changes)} change(s) from {name} poll.")
+                    await asyncio.to_thread(self._notify, changes)
+                alerts = self.new_alerts(funds_data)
+                if alerts:
+                    await asyncio.to_thread(self.monitor.send_alerts, alerts)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def run(self):
+        lock = asyncio.Lock()
+        print(f"Watch: baseline poll of {len(self.monitor.funds_config)} funds...")
+        baseline = await asyncio.to_thread(self._poll_full)
+        self.diff(baseline)
+        alerts = self.new_alerts(baseline)
+        if alerts:
+            await asyncio.to_thread(self.monitor.send_alerts, alerts)
+        await asyncio.gather(
+            self._poll_loop("bulk", self._poll_bulk, self.bulk_interval, lock),
+            self._poll_loop("full", self._poll_full, self.full_interval, lock),
+        )
+        print("Watch: stopped.")